@@ -1,169 +1,49 @@
-import os
-import json
-import getpass
+import re
+import sys
 import argparse
-import bcrypt
-from src.core.database import Database
-from src.query.query_parser import QueryParser
+from collections import OrderedDict
 from src.config import logger
 from src.core.exceptions import ValidationError, KiteDBError, TransactionError
 from src.config import config
+from src.auth.auth_manager import AuthManager
+from src.storage.db_catalog import list_databases
+from src.auth.login_throttle import LoginThrottle
+from src import json_codec
+from src.help import HELP_MESSAGE
 
-HELP_MESSAGE = """
-KiteDB v2.0 Help
-================
-
-KiteDB is a NoSQL JSON database supporting collections, transactions, and complex queries.
-
-General Commands
----------------
-- login <username>                  Authenticate user (e.g., 'login admin').
-- use <database_name>               Switch to a database (e.g., 'use mydb'). Creates if it doesn't exist.
-- exitdb                            Exit the current database context without exiting the program.
-- list                              List all databases in the storage root.
-- create <collection_name> [schema] Create a collection with an optional JSON schema.
-- delete <collection_name>          Delete a collection (e.g., 'delete users').
-- begin                             Start a transaction for atomic operations.
-- commit                            Commit the current transaction.
-- rollback                          Roll back the current transaction.
-- exit                              Exit the KiteDB console.
-- help                              Display this help message.
-- adduser <username> <password>     Add a new user.
-- removeuser <username>             Remove an existing user.
-- setperm <username> <db_name> <coll_name> <perm1> [perm2 ...]  
-  - Set permissions for a user on a database or collection.
-  - Permissions: read, write, update, delete, create, access
-  - Use 'access denied' to deny all access to a database (e.g., 'setperm ali testdb * access denied').
-  - Use 'access allowed' to grant access to a database (e.g., 'setperm ali testdb * access allowed read write update').
-  - Example: setperm ali testdb users read write update
-- listperms [username]              List permissions for a user or all users.
-
-Collection Operations
---------------------
-Format: <collection>.<operation>{<parameters>}
-Parameters must be valid JSON objects or arrays, enclosed in curly braces {}.
-
-1. add{<document> | [<document>, ...]}
-   - Add one or more documents to a collection.
-   - Example: users.add{{"name": "Alice", "age": 25}}
-2. find{<query>}
-   - Find documents matching the query.
-   - Example: users.find{"name": "Alice"}
-3. update{<query>,<update>}
-   - Update documents matching the query.
-   - Example: users.update{"name": "Alice", "age": 26}
-4. delete{<query>}
-   - Delete documents matching the query.
-   - Example: users.delete{"name": "Alice"}
-
-Supported Query Operators
-------------------------
-- Comparison: $eq, $ne, $gt, $gte, $lt, $lte
-- Logical: $and, $or, $not
-- Dot notation for nested fields: e.g., "address.city": "San Francisco"
-"""
+_HELP_BYTES = (HELP_MESSAGE + "\n").encode("utf-8")
+
+# Maximum number of opened databases kept around for repeated 'use' commands
+_DB_CACHE_SIZE = 8
+
+# Cheap shape check so obviously malformed input never reaches QueryParser
+_COLL_OP_RE = re.compile(r'\w+\.\w+\s*\{')
 
 class KiteDBConsole:
+    __slots__ = (
+        "current_db", "_db_cache", "running", "authenticated", "current_user",
+        "auth", "_throttle", "_tty", "_interactive", "_dispatch",
+    )
+
     def __init__(self):
         self.current_db = None
+        self._db_cache = OrderedDict()
         self.running = True
         self.authenticated = False
         self.current_user = None
-        self.users_file = "users.json"
-        self.acl_file = "acl.json"
-        self.users = self.load_users()
-        self.acl = self.load_acl()
-
-    def load_users(self):
-        """Load users from users.json or create default if file doesn't exist."""
-        if os.path.exists(self.users_file):
-            with open(self.users_file, "r") as f:
-                return json.load(f)
-        default_users = {"admin": bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')}
-        with open(self.users_file, "w") as f:
-            json.dump(default_users, f, indent=2)
-        return default_users
-
-    def save_users(self):
-        """Save users to users.json."""
-        with open(self.users_file, "w") as f:
-            json.dump(self.users, f, indent=2)
-
-    def load_acl(self):
-        """Load ACL from acl.json or create default if file doesn't exist."""
-        if os.path.exists(self.acl_file):
-            with open(self.acl_file, "r") as f:
-                return json.load(f)
-        # Default ACL only needs to initialize for non-admin users; admin gets all permissions implicitly
-        default_acl = {
-            "admin": {
-                "databases": {}
-            }
+        self.auth = AuthManager()
+        self.auth.load_users()
+        self.auth.load_acl()
+        self._throttle = LoginThrottle(
+            config.get("auth.max_failed_logins", 5), config.get("auth.lockout_seconds", 30)
+        )
+        self._tty = sys.stdout.isatty()
+        self._interactive = sys.stdin.isatty()
+        # Bind handlers once so dispatch is a single dict lookup per command
+        self._dispatch = {
+            sys.intern(name): getattr(self, handler.__name__)
+            for name, handler in self.DB_COMMANDS.items()
         }
-        with open(self.acl_file, "w") as f:
-            json.dump(default_acl, f, indent=2)
-        return default_acl
-
-    def save_acl(self):
-        """Save ACL to acl.json."""
-        with open(self.acl_file, "w") as f:
-            json.dump(self.acl, f, indent=2)
-
-    def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt."""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-    def check_password(self, password: str, hashed: str) -> bool:
-        """Check if a password matches the hashed version."""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
-    def has_permission(self, user: str, db_name: str, collection_name: str, operation: str) -> bool:
-        # Admin has all permissions by default
-        if user == "admin":
-            return True
-
-        # Reload ACL to ensure we have the latest permissions
-        self.acl = self.load_acl()
-        if user not in self.acl:
-            return False
-        user_perms = self.acl[user]
-        db_perms = user_perms.get("databases", {})
-        
-        # Check database-level access (deny if explicitly denied)
-        if db_name in db_perms and "access" in db_perms[db_name] and db_perms[db_name]["access"] == "denied":
-            return False
-        
-        # Check global permissions
-        if "*" in db_perms:
-            coll_perms = db_perms["*"].get("collections", {})
-            if "*" in coll_perms and operation in coll_perms["*"]:
-                return True
-        
-        # Check specific database permissions
-        db_perm = db_perms.get(db_name, {})
-        if "access" in db_perm and db_perm["access"] == "denied":
-            return False
-        coll_perms = db_perm.get("collections", {})
-        
-        # For database-level access (e.g., 'use'), allow if read permission exists on any collection
-        if operation == "read" and collection_name == "*":
-            if "*" in coll_perms and "read" in coll_perms["*"]:
-                return True
-            for coll, perms in coll_perms.items():
-                if "read" in perms:
-                    return True
-            return False
-        
-        # For collection-specific operations
-        if "*" in coll_perms and operation in coll_perms["*"]:
-            return True
-        if collection_name in coll_perms and operation in coll_perms[collection_name]:
-            return True
-        
-        # Map operations to permissions
-        perm_map = {"find": "read", "add": "write", "update": "update", "delete": "delete", "create": "create"}
-        required_perm = perm_map.get(operation, operation)
-        return required_perm in coll_perms.get("*", []) or required_perm in coll_perms.get(collection_name, [])
 
     def run(self):
         print("Welcome to KiteDB v2.0")
@@ -177,10 +57,10 @@ class KiteDBConsole:
                 else f"kiteDB [{self.current_user}] > "
             )
             try:
-                cmd = input(prompt).strip()
-                if not cmd:
+                cmd = self._read_line(prompt)
+                if not cmd or cmd.isspace():
                     continue
-                self.handle_command(cmd)
+                self.handle_command(cmd.strip())
             except EOFError:
                 print("\nExiting KiteDB...")
                 break
@@ -189,84 +69,142 @@ class KiteDBConsole:
                 continue
             except Exception as e:
                 print(f"Unexpected error: {e}")
-                logger.error(f"Console error: {e}")
+                logger.error("Console error: %s", e)
+
+    def _read_line(self, prompt: str) -> str:
+        """Read one line of input, bypassing input() when stdin is not a terminal."""
+        if self._interactive:
+            return input(prompt)
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            raise EOFError
+        return line.rstrip("\r\n")
 
     def handle_login(self):
-        self.users = self.load_users()
-        username = input("Username: ").strip()
-        password = getpass.getpass("Password: ")
-        if username in self.users and self.check_password(password, self.users[username]):
+        username = self._read_line("Username: ").strip()
+        if self._interactive:
+            import getpass
+
+            password = getpass.getpass("Password: ")
+        else:
+            password = self._read_line("Password: ")
+        if self._throttle.is_locked(username):
+            print("Too many failed login attempts. Try again later.")
+            logger.warning("Login for '%s' refused: locked out", username)
+            return
+        if self.auth.authenticate(username, password):
+            self._throttle.reset(username)
             self.authenticated = True
-            self.current_user = username
+            self.current_user = sys.intern(username)
             print("Login successful")
-            logger.info(f"User '{username}' logged in")
+            logger.info("User '%s' logged in", username)
         else:
+            self._throttle.record_failure(username)
             print("Invalid credentials")
-            logger.warning(f"Failed login attempt for '{username}'")
+            logger.warning("Failed login attempt for '%s'", username)
 
     def handle_command(self, cmd: str):
         if not cmd or cmd.isspace():
             print("Invalid command. Use 'help' for available commands.")
             return
-        parts = cmd.split(maxsplit=1)
-        command = parts[0].lower()
+        # Split at the first run of whitespace, as str.split() does, so tabs separate words too
+        parts = cmd.split(None, 1)
+        command = parts[0]
         arg = parts[1] if len(parts) > 1 else ""
-        if command in self.DB_COMMANDS:
-            self.DB_COMMANDS[command](self, arg)
-        else:
-            self.handle_collection_operation(cmd)
+        handler = self._dispatch.get(command) or self._dispatch.get(command.lower())
+        # Every permission check made while handling this command sees the same ACL
+        with self.auth.snapshot():
+            if handler is not None:
+                handler(arg.lstrip())
+            elif _COLL_OP_RE.match(cmd):
+                self.handle_collection_operation(cmd)
+            else:
+                print("Invalid command. Use 'help' for available commands.")
 
     def handle_use(self, arg: str):
         db_name = arg.strip()
         if not db_name:
             print("Invalid command. Use 'help' for available commands.")
             return
-        if not self.has_permission(self.current_user, db_name, "*", "read"):
+        if not self.auth.has_permission(self.current_user, db_name, "*", "read"):
             print("Permission denied: No access to database")
             return
         try:
-            self.current_db = Database(db_name)
-            db_path = os.path.abspath(self.current_db.storage.db_path)
+            # Each use used to open a fresh Database, dropping any open transaction; keep that behaviour
+            self._rollback_open_transaction(self.current_db, "switching database")
+            self.current_db = self._open_database(db_name)
+            db_path = self.current_db.storage.abs_db_path
             print(f"Database path: {db_path}")
             print(f"Switched to database '{db_name}'")
-            logger.info(f"Switched to database '{db_name}' at '{db_path}'")
+            logger.info("Switched to database '%s' at '%s'", db_name, db_path)
         except KiteDBError as e:
             print(f"Error: {e}")
-            logger.error(f"Use database failed: {e}")
+            logger.error("Use database failed: %s", e)
+
+    def _open_database(self, db_name: str):
+        """Return a cached Database instance, opening it on first use."""
+        db = self._db_cache.get(db_name)
+        if db is None:
+            from src.core.database import Database
+
+            db = Database(db_name)
+            self._db_cache[db_name] = db
+            if len(self._db_cache) > _DB_CACHE_SIZE:
+                self._close_database(self._db_cache.popitem(last=False)[1])
+        else:
+            self._db_cache.move_to_end(db_name)
+        return db
+
+    def _rollback_open_transaction(self, db, reason: str):
+        """Roll back db's transaction if one is active, so it can't be committed from a later session."""
+        if db and db.transaction and db.transaction.active:
+            try:
+                db.transaction.rollback()
+                print(f"Rolled back open transaction in '{db.name}' ({reason})")
+                logger.info("Rolled back open transaction in '%s' (%s)", db.name, reason)
+            except TransactionError as e:
+                print(f"Error: {e}")
+                logger.error("Rollback failed in '%s': %s", db.name, e)
+
+    def _close_database(self, db):
+        """Snapshot a database the console is done with, reporting rather than raising on failure."""
+        self._rollback_open_transaction(db, "closing database")
+        try:
+            db.flush()
+        except KiteDBError as e:
+            print(f"Warning: could not snapshot database '{db.name}': {e}")
+            logger.error("Flush database '%s' failed: %s", db.name, e)
 
     def handle_exitdb(self, arg: str):
         if not self.current_db:
             print("Not currently in a database context.")
             return
+        self._rollback_open_transaction(self.current_db, "leaving database")
         self.current_db = None
         print("Exited current database context.")
         logger.info("Exited current database context.")
 
     def handle_list(self, arg: str):
         try:
-            databases = []
             data_root = config.get("storage.data_root")
-            for entry in os.listdir(data_root):
-                path = os.path.join(data_root, entry)
-                if os.path.isdir(path):
-                    databases.append(entry)
-            databases.sort()
+            databases = list_databases(data_root)
             if databases:
                 print("Databases:")
-                for db in databases:
-                    if self.has_permission(self.current_user, db, "*", "read"):
-                        print(f"  {db}")
+                for db in self.auth.readable_databases(self.current_user, databases):
+                    print(f"  {db}")
             else:
                 print("No databases found")
         except Exception as e:
             print(f"Error listing databases: {e}")
-            logger.error(f"Error listing databases: {e}")
+            logger.error("Error listing databases: %s", e)
 
     def handle_create(self, arg: str):
         if not self.current_db:
             print("Invalid command. Use 'help' for available commands.")
             return
-        if not self.has_permission(self.current_user, self.current_db.name, "*", "create"):
+        if not self.auth.has_permission(self.current_user, self.current_db.name, "*", "create"):
             print("Permission denied: No create access to database")
             return
         parts = arg.strip().split(maxsplit=1)
@@ -276,24 +214,25 @@ class KiteDBConsole:
             print("Invalid command. Use 'help' for available commands.")
             return
         try:
-            schema_dict = json.loads(schema) if schema else None
+            schema_dict = json_codec.loads(schema) if schema else None
             self.current_db.create_collection(collection_name, schema_dict)
             print(f"Collection '{collection_name}' created")
             logger.info(
-                f"Created collection '{collection_name}' in '{self.current_db.name}'"
+                "Created collection '%s' in '%s'",
+                collection_name, self.current_db.name,
             )
         except KiteDBError as e:
             print(f"Error: {e}")
-            logger.error(f"Create collection failed: {e}")
-        except json.JSONDecodeError as e:
+            logger.error("Create collection failed: %s", e)
+        except json_codec.JSONDecodeError as e:
             print(f"Invalid schema JSON: {e}")
-            logger.error(f"Invalid schema JSON: {e}")
+            logger.error("Invalid schema JSON: %s", e)
 
     def handle_delete(self, arg: str):
         if not self.current_db:
             print("Invalid command. Use 'help' for available commands.")
             return
-        if not self.has_permission(self.current_user, self.current_db.name, arg.strip(), "delete"):
+        if not self.auth.has_permission(self.current_user, self.current_db.name, arg.strip(), "delete"):
             print("Permission denied: No delete access to collection")
             return
         collection_name = arg.strip()
@@ -307,11 +246,12 @@ class KiteDBConsole:
             else:
                 print(f"Collection '{collection_name}' deleted")
             logger.info(
-                f"Deleted collection '{collection_name}' from '{self.current_db.name}'"
+                "Deleted collection '%s' from '%s'",
+                collection_name, self.current_db.name,
             )
         except KiteDBError as e:
             print(f"Error: {e}")
-            logger.error(f"Delete collection failed: {e}")
+            logger.error("Delete collection failed: %s", e)
 
     def handle_begin(self, arg: str):
         if not self.current_db:
@@ -320,10 +260,10 @@ class KiteDBConsole:
         try:
             self.current_db.begin_transaction()
             print("Transaction begun")
-            logger.info(f"Transaction begun in '{self.current_db.name}'")
+            logger.info("Transaction begun in '%s'", self.current_db.name)
         except KiteDBError as e:
             print(f"Error: {e}")
-            logger.error(f"Begin transaction failed: {e}")
+            logger.error("Begin transaction failed: %s", e)
 
     def handle_commit(self, arg: str):
         if not self.current_db:
@@ -335,10 +275,10 @@ class KiteDBConsole:
         try:
             self.current_db.transaction.commit()
             print("Transaction committed")
-            logger.info(f"Transaction committed in '{self.current_db.name}'")
+            logger.info("Transaction committed in '%s'", self.current_db.name)
         except TransactionError as e:
             print(f"Error: {e}")
-            logger.error(f"Commit transaction failed: {e}")
+            logger.error("Commit transaction failed: %s", e)
 
     def handle_rollback(self, arg: str):
         if not self.current_db:
@@ -350,18 +290,28 @@ class KiteDBConsole:
         try:
             self.current_db.transaction.rollback()
             print("Transaction rolled back")
-            logger.info(f"Transaction rolled back in '{self.current_db.name}'")
+            logger.info("Transaction rolled back in '%s'", self.current_db.name)
         except TransactionError as e:
             print(f"Error: {e}")
-            logger.error(f"Rollback transaction failed: {e}")
+            logger.error("Rollback transaction failed: %s", e)
 
     def handle_exit(self, arg: str):
         self.running = False
+        self.current_db = None
+        for db in self._db_cache.values():
+            self._close_database(db)
+        self._db_cache.clear()
         print("Exiting KiteDB...")
         logger.info("Console exited")
 
     def handle_help(self, arg: str):
-        print(HELP_MESSAGE)
+        buffer = getattr(sys.stdout, "buffer", None)
+        if buffer is None:
+            print(HELP_MESSAGE)
+            return
+        sys.stdout.flush()
+        buffer.write(_HELP_BYTES)
+        buffer.flush()
 
     def handle_adduser(self, arg: str):
         parts = arg.strip().split()
@@ -369,32 +319,32 @@ class KiteDBConsole:
             print("Invalid command. Use 'help' for available commands.")
             return
         username, password = parts[0], parts[1]
-        if username in self.users:
+        if username in self.auth.users:
             print("User already exists")
             return
-        self.users[username] = self.hash_password(password)
-        self.save_users()
+        self.auth.users[username] = self.auth.hash_password(password)
+        self.auth.save_users()
         print(f"User '{username}' added")
-        logger.info(f"Added user '{username}'")
+        logger.info("Added user '%s'", username)
 
     def handle_removeuser(self, arg: str):
         username = arg.strip()
         if not username:
             print("Invalid command. Use 'help' for available commands.")
             return
-        if username not in self.users:
+        if username not in self.auth.users:
             print("User not found")
             return
         if username == self.current_user:
             print("Cannot remove current user")
             return
-        del self.users[username]
-        if username in self.acl:
-            del self.acl[username]
-        self.save_users()
-        self.save_acl()
+        del self.auth.users[username]
+        if username in self.auth.acl:
+            del self.auth.acl[username]
+        self.auth.save_users()
+        self.auth.save_acl()
         print(f"User '{username}' removed")
-        logger.info(f"Removed user '{username}'")
+        logger.info("Removed user '%s'", username)
 
     def handle_setperm(self, arg: str):
         parts = arg.strip().split()
@@ -430,43 +380,46 @@ class KiteDBConsole:
             print(f"Invalid permissions. Use: {valid_perms}")
             return
 
-        if username not in self.acl:
-            self.acl[username] = {"databases": {}}
-        if db_name not in self.acl[username]["databases"]:
-            self.acl[username]["databases"][db_name] = {"collections": {}}
+        if username not in self.auth.acl:
+            self.auth.acl[username] = {"databases": {}}
+        if db_name not in self.auth.acl[username]["databases"]:
+            self.auth.acl[username]["databases"][db_name] = {"collections": {}}
 
         # Handle database-level access
         if access_setting:
-            self.acl[username]["databases"][db_name]["access"] = access_setting
+            self.auth.acl[username]["databases"][db_name]["access"] = access_setting
             if access_setting == "denied":
-                self.acl[username]["databases"][db_name]["collections"][coll_name] = []
+                self.auth.acl[username]["databases"][db_name]["collections"][coll_name] = []
                 print(f"Access denied for '{username}' on database '{db_name}'")
             else:
-                self.acl[username]["databases"][db_name]["collections"][coll_name] = permissions
+                self.auth.acl[username]["databases"][db_name]["collections"][coll_name] = permissions
                 print(f"Access granted for '{username}' on '{db_name}.{coll_name}': {permissions}")
         else:
-            self.acl[username]["databases"][db_name]["access"] = "allowed"
-            self.acl[username]["databases"][db_name]["collections"][coll_name] = permissions
+            self.auth.acl[username]["databases"][db_name]["access"] = "allowed"
+            self.auth.acl[username]["databases"][db_name]["collections"][coll_name] = permissions
             print(f"Permissions set for '{username}' on '{db_name}.{coll_name}': {permissions}")
 
-        self.save_acl()
-        logger.info(f"Set permissions for '{username}' on '{db_name}.{coll_name}': {permissions}")
+        self.auth.save_acl()
+        logger.info(
+            "Set permissions for '%s' on '%s.%s': %s",
+            username, db_name, coll_name, permissions,
+        )
 
     def handle_listperms(self, arg: str):
         username = arg.strip()
-        if username and username not in self.acl:
+        if username and username not in self.auth.acl:
             print("User not found")
             return
         if username:
             print(f"Permissions for '{username}':")
-            for db_name, db_perm in self.acl[username].get("databases", {}).items():
+            for db_name, db_perm in self.auth.acl[username].get("databases", {}).items():
                 access = db_perm.get("access", "allowed")
                 print(f"  {db_name}: Access = {access}")
                 for coll_name, perms in db_perm.get("collections", {}).items():
                     print(f"    {db_name}.{coll_name}: {perms}")
         else:
             print("Permissions for all users:")
-            for user, perms in self.acl.items():
+            for user, perms in self.auth.acl.items():
                 print(f"  User: {user}")
                 for db_name, db_perm in perms.get("databases", {}).items():
                     access = db_perm.get("access", "allowed")
@@ -478,65 +431,87 @@ class KiteDBConsole:
         if not self.current_db:
             print("Invalid command. Use 'help' for available commands.")
             return
+        from src.query.query_parser import QueryParser
+
         try:
             parsed = QueryParser.parse(cmd)
             op = parsed["operation"]
             collection_name = parsed["collection"]
-            if not self.has_permission(self.current_user, self.current_db.name, collection_name, op):
+            if not self.auth.has_permission(self.current_user, self.current_db.name, collection_name, op):
                 print("Permission denied")
-                logger.warning(f"Permission denied for user '{self.current_user}' on '{cmd}'")
+                logger.warning(
+                    "Permission denied for user '%s' on '%s'",
+                    self.current_user, cmd,
+                )
                 return
             query = parsed.get("query", {})
             data = parsed.get("data", {})
 
-            if op not in ["add", "find", "update", "delete"]:
+            handler = self.COLLECTION_OPS.get(op)
+            if handler is None:
                 print("Invalid command. Use 'help' for available commands.")
-                logger.warning(f"Unknown operation attempted: {op}")
+                logger.warning("Unknown operation attempted: %s", op)
                 return
 
             coll = self.current_db.get_collection(collection_name)
             logger.info(
-                f"Executing {op} on '{collection_name}': query={query}, data={data}"
+                "Executing %s on '%s': query=%s, data=%s",
+                op, collection_name, query, data,
             )
 
-            if op == "add":
-                res = coll.insert(data)
-                if res == "logged":
-                    print("Insertion logged")
-                else:
-                    if isinstance(res, list):
-                        print(f"Inserted {len(res)} documents with IDs: {res}")
-                    else:
-                        print(f"Inserted document with ID: {res}")
-            elif op == "find":
-                res = coll.find(query)
-                if not res:
-                    print("No documents found")
-                else:
-                    for doc in res:
-                        print(json.dumps(doc, indent=2))
-            elif op == "update":
-                res = coll.update(query, data)
-                if res == "logged":
-                    print("Update logged")
-                else:
-                    print(f"Updated {res} documents")
-            elif op == "delete":
-                res = coll.delete(query)
-                if res == "logged":
-                    print("Delete logged")
-                else:
-                    print(f"Deleted {res} documents")
+            handler(self, coll, query, data)
 
         except ValidationError as e:
             print(f"Validation error: {e}")
-            logger.error(f"Validation error in command '{cmd}': {e}")
+            logger.error("Validation error in command '%s': %s", cmd, e)
         except KiteDBError as e:
             print(f"Database error: {e}")
-            logger.error(f"Database error in command '{cmd}': {e}")
+            logger.error("Database error in command '%s': %s", cmd, e)
         except Exception as e:
             print(f"Unexpected error: {e}")
-            logger.error(f"Unexpected error in command '{cmd}': {e}")
+            logger.error("Unexpected error in command '%s': %s", cmd, e)
+
+    def _op_add(self, coll, query, data):
+        res = coll.insert(data)
+        if res == "logged":
+            print("Insertion logged")
+        else:
+            if isinstance(res, list):
+                print(f"Inserted {len(res)} documents with IDs: {res}")
+            else:
+                print(f"Inserted document with ID: {res}")
+
+    def _op_find(self, coll, query, data):
+        # Results are only serialized, and the console is single-threaded, so nothing can
+        # change them meanwhile; skip the defensive per-document copies
+        res = coll.find(query, copy=False)
+        if not res:
+            print("No documents found")
+        elif not self._tty:
+            # Piped output: emit the whole result set in a single write
+            sys.stdout.write("\n".join(map(json_codec.dumps_pretty, res)) + "\n")
+        else:
+            # Stream each document's encoding straight to stdout
+            iter_pretty = json_codec.iter_pretty
+            write = sys.stdout.write
+            for doc in res:
+                for chunk in iter_pretty(doc):
+                    write(chunk)
+                write("\n")
+
+    def _op_update(self, coll, query, data):
+        res = coll.update(query, data)
+        if res == "logged":
+            print("Update logged")
+        else:
+            print(f"Updated {res} documents")
+
+    def _op_delete(self, coll, query, data):
+        res = coll.delete(query)
+        if res == "logged":
+            print("Delete logged")
+        else:
+            print(f"Deleted {res} documents")
 
     DB_COMMANDS = {
         "login": handle_login,
@@ -556,6 +531,13 @@ class KiteDBConsole:
         "listperms": handle_listperms,
     }
 
+    COLLECTION_OPS = {
+        "add": _op_add,
+        "find": _op_find,
+        "update": _op_update,
+        "delete": _op_delete,
+    }
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="KiteDB Console or Server")
     parser.add_argument("--server", action="store_true", help="Run as server")
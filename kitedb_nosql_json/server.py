@@ -1,560 +1,482 @@
 import socketserver
-import json
+import sys
 import threading
 import os
-import bcrypt
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from src.core.database import Database
 from src.query.query_parser import QueryParser
 from src.config import logger
 from src.core.exceptions import ValidationError, KiteDBError, TransactionError
 from src.config import config
-from datetime import datetime
+from src.auth.auth_manager import AuthManager
+from src.storage.db_catalog import list_databases
+from src.auth.session_store import SessionStore
+from src.auth.login_throttle import LoginThrottle
+from src import json_codec
+from src.help import HELP_MESSAGE
+
+# Server clients need 'write' permission for updates
+SERVER_PERM_MAP = {"find": "read", "add": "write", "update": "write", "delete": "delete", "create": "create"}
+# Find results longer than this are cut short in the command log
+_LOG_DATA_LIMIT = 100
+
+# Optional length-prefixed framing: 4-byte big-endian payload length, then the payload.
+# Frames are capped below 16 MiB, so their first byte is always 0x00, which never starts a text command.
+_FRAME_HEADER = struct.Struct(">I")
+# Largest payload either framing accepts; a plain command line longer than this is refused
+_MAX_FRAME = (1 << 24) - 1
+
+
+class _CannedResponse(dict):
+    """A constant response whose JSON encoding is computed once at import."""
+
+    __slots__ = ("body",)
+
+    def __init__(self, status: str, message: str):
+        super().__init__(status=status, message=message)
+        self.body = json_codec.dumps_bytes(self)
+
+
+# Fixed responses shared by every connection; handle() sends their cached bytes as-is
+_ERR_INVALID = _CannedResponse("error", "Invalid command. Use 'help' for available commands.")
+_ERR_NO_TRANSACTION = _CannedResponse("error", "No active transaction")
+_ERR_PERMISSION_DENIED = _CannedResponse("error", "Permission denied")
+_ERR_NOT_LOGGED_IN = _CannedResponse("error", "Please login first")
+_ERR_INVALID_CREDENTIALS = _CannedResponse("error", "Invalid credentials")
+_ERR_LOCKED_OUT = _CannedResponse("error", "Too many failed login attempts. Try again later.")
+_ERR_INVALID_TOKEN = _CannedResponse("error", "Invalid or expired session token")
+_OK_TRANSACTION_BEGUN = _CannedResponse("success", "Transaction begun")
+_OK_TRANSACTION_COMMITTED = _CannedResponse("success", "Transaction committed")
+_OK_TRANSACTION_ROLLED_BACK = _CannedResponse("success", "Transaction rolled back")
+_OK_INSERT_LOGGED = _CannedResponse("success", "Insertion logged")
+_OK_UPDATE_LOGGED = _CannedResponse("success", "Update logged")
+_OK_DELETE_LOGGED = _CannedResponse("success", "Delete logged")
+_OK_CONNECTION_CLOSED = _CannedResponse("success", "Connection closed")
+_OK_HELP = _CannedResponse("success", HELP_MESSAGE)
+
+def _format_logged_data(data) -> str:
+    """Pretty-print response data for the log, keeping only the first _LOG_DATA_LIMIT documents.
+
+    Never raises: the command has already succeeded, and a log line must not turn its
+    response into an error.
+    """
+    try:
+        if isinstance(data, list) and len(data) > _LOG_DATA_LIMIT:
+            return "%s\n... (%d more documents)" % (
+                json_codec.dumps_pretty(data[:_LOG_DATA_LIMIT]), len(data) - _LOG_DATA_LIMIT
+            )
+        return json_codec.dumps_pretty(data)
+    except Exception as e:
+        return "<response data not logged: %s>" % e
 
 class KiteDBRequestHandler(socketserver.BaseRequestHandler):
     """Handle individual client connections and process their commands."""
     
     def __init__(self, request, client_address, server):
-        self.users_file = "users.json"
-        self.acl_file = "acl.json"
+        # Users and ACL are parsed once per server and shared by every connection
+        self.auth = server.auth
         self.authenticated = False
         self.current_user = None
         self.current_db = None
         self.session_lock = threading.Lock()
-        print(f"Initialized handler for client {client_address}")
-        super().__init__(request, client_address, server)
-
-    def load_users(self):
-        """Load users from users.json or create default if file doesn't exist."""
-        print(os.path)
-        if os.path.exists(self.users_file):
-            with open(self.users_file, "r") as f:
-                return json.load(f)
-        default_users = {"admin": bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')}
-        with open(self.users_file, "w") as f:
-            json.dump(default_users, f, indent=2)
-        return default_users
-
-    def load_acl(self):
-        """Load ACL from acl.json or create default if file doesn't exist."""
-        print(f"Loading ACL from {self.acl_file}")
-        if os.path.exists(self.acl_file):
-            with open(self.acl_file, "r") as f:
-                acl = json.load(f)
-                print(f"Loaded ACL: {acl}")
-                return acl
-        # Default ACL only initializes an empty structure for admin; permissions are implicit
-        default_acl = {
-            "admin": {
-                "databases": {}
-            }
+        # Bind command handlers once per connection instead of per command
+        self._commands = {
+            name: getattr(self, handler.__name__)
+            for name, handler in self.DB_COMMANDS.items()
         }
-        print(f"ACL file does not exist, creating default ACL: {default_acl}")
-        with open(self.acl_file, "w") as f:
-            json.dump(default_acl, f, indent=2)
-        return default_acl
-
-    def save_acl(self):
-        """Save ACL to acl.json."""
-        print(f"Saving ACL to {self.acl_file}: {self.acl}")
-        with open(self.acl_file, "w") as f:
-            json.dump(self.acl, f, indent=2)
-
-    def has_permission(self, user: str, db_name: str, collection_name: str, operation: str) -> bool:
-        """Check if the user has the required permission."""
-        print(f"Checking permission for user '{user}' on db '{db_name}', collection '{collection_name}', operation '{operation}'")
-        # Admin has all permissions by default
-        if user == "admin":
-            print(f"Admin user detected, granting all permissions")
-            return True
-
-        acl = self.load_acl()
-        if user not in acl:
-            print(f"User '{user}' not found in ACL")
-            return False
-        user_perms = acl[user]
-        db_perms = user_perms.get("databases", {})
-        print(f"User permissions: {user_perms}")
-        
-        # Check database-level access (deny if explicitly denied)
-        if db_name in db_perms and "access" in db_perms[db_name] and db_perms[db_name]["access"] == "denied":
-            print(f"Access denied for db '{db_name}'")
-            return False
-        
-        # Check global permissions
-        if "*" in db_perms:
-            coll_perms = db_perms["*"].get("collections", {})
-            if "*" in coll_perms and operation in coll_perms["*"]:
-                print(f"Global permission granted: {operation} in {coll_perms['*']}")
-                return True
-        
-        # Check specific database permissions
-        db_perm = db_perms.get(db_name, {})
-        if "access" in db_perm and db_perm["access"] == "denied":
-            print(f"Access denied for db '{db_name}'")
-            return False
-        coll_perms = db_perm.get("collections", {})
-        print(f"Collection permissions for db '{db_name}': {coll_perms}")
-        
-        # For database-level access (e.g., 'use'), allow if read permission exists on any collection
-        if operation == "read" and collection_name == "*":
-            if "*" in coll_perms and "read" in coll_perms["*"]:
-                print("Read permission granted for all collections")
-                return True
-            for coll, perms in coll_perms.items():
-                if "read" in perms:
-                    print(f"Read permission granted for collection '{coll}'")
-                    return True
-            print("No read permission found for any collection")
-            return False
-        
-        # For collection-specific operations
-        if "*" in coll_perms and operation in coll_perms["*"]:
-            print(f"Collection wildcard permission granted: {operation}")
-            return True
-        if collection_name in coll_perms and operation in coll_perms[collection_name]:
-            print(f"Specific collection permission granted: {operation} in {collection_name}")
-            return True
-        
-        # Map operations to permissions
-        perm_map = {"find": "read", "add": "write", "update": "write", "delete": "delete", "create": "create"}
-        required_perm = perm_map.get(operation, operation)
-        granted = required_perm in coll_perms.get("*", []) or required_perm in coll_perms.get(collection_name, [])
-        print(f"Permission check result: {granted} (required: {required_perm})")
-        return granted
+        super().__init__(request, client_address, server)
 
     def handle(self):
         """Process client requests in a loop until disconnection."""
-        print(f"New connection from {self.client_address}")
-        logger.info(f"New connection from {self.client_address}")
+        logger.info("New connection from %s", self.client_address)
+        # Buffered reader: one command per line, however the bytes arrive on the socket
+        rfile = self.request.makefile('rb', buffering=65536)
         try:
             while True:
-                data = self.request.recv(1024).decode('utf-8').strip()
-                print(f"Received raw data from {self.client_address}: '{data}'")
+                framed, payload = self._read_message(rfile)
+                data = payload.decode('utf-8').strip()
                 if not data:
-                    print(f"Empty data received, closing connection for {self.client_address}")
+                    logger.debug("Empty data received, closing connection for %s", self.client_address)
                     break
-                logger.debug(f"Received from {self.client_address}: {data}")
+                logger.debug("Received from %s: %s", self.client_address, data)
                 response = self.process_command(data)
-                print(f"Sending response to {self.client_address}: {response}")
-                self.request.sendall(json.dumps(response).encode('utf-8') + b'\n')
+                logger.debug("Sending response to %s: %s", self.client_address, response)
+                body = response.body if type(response) is _CannedResponse else json_codec.dumps_bytes(response)
+                # Reply in the same framing the client used
+                if framed:
+                    self.request.sendall(_FRAME_HEADER.pack(len(body)) + body)
+                else:
+                    self.request.sendall(body + b'\n')
         except ConnectionError:
-            print(f"Connection error: Client {self.client_address} disconnected")
-            logger.info(f"Client {self.client_address} disconnected")
-            if self.current_db and self.current_db.transaction and self.current_db.transaction.active:
-                try:
-                    self.current_db.transaction.rollback()
-                    print(f"Rolled back transaction for disconnected client {self.client_address}")
-                    logger.info(f"Rolled back transaction for disconnected client {self.client_address}")
-                except TransactionError as e:
-                    print(f"Rollback failed for {self.client_address}: {e}")
-                    logger.error(f"Rollback failed for {self.client_address}: {e}")
+            logger.info("Client %s disconnected", self.client_address)
         except Exception as e:
-            print(f"Unexpected error handling client {self.client_address}: {e}")
-            logger.error(f"Error handling client {self.client_address}: {e}")
+            logger.error("Error handling client %s: %s", self.client_address, e)
         finally:
-            print(f"Closing connection for {self.client_address}")
+            # Databases are shared and this worker thread will serve other clients, so an
+            # unfinished transaction must not outlive the connection
+            self._rollback_open_transaction("disconnect")
+            logger.debug("Closing connection for %s", self.client_address)
+            rfile.close()
             self.request.close()
 
+    @staticmethod
+    def _read_message(rfile) -> tuple:
+        """Read one command, returning (framed, payload); payload is empty once the client is gone."""
+        first = rfile.read(1)
+        if first != b'\x00':
+            if not first:
+                return False, b''
+            # Bounded like a frame, so a client that never sends a newline can't grow the buffer
+            line = rfile.readline(_MAX_FRAME)
+            if len(line) == _MAX_FRAME and not line.endswith(b'\n'):
+                logger.warning("Dropping connection: command line exceeds %d bytes", _MAX_FRAME)
+                return False, b''
+            return False, first + line
+        header = first + rfile.read(_FRAME_HEADER.size - 1)
+        if len(header) < _FRAME_HEADER.size:
+            return True, b''
+        length, = _FRAME_HEADER.unpack(header)
+        payload = rfile.read(length)
+        # A frame cut short by a disconnect is dropped rather than executed
+        return True, payload if len(payload) == length else b''
+
+    def _rollback_open_transaction(self, reason: str):
+        """Roll back this session's transaction on the current database, if one is active."""
+        if self.current_db and self.current_db.transaction and self.current_db.transaction.active:
+            try:
+                self.current_db.transaction.rollback()
+                logger.info("Rolled back open transaction for %s (%s)", self.client_address, reason)
+            except TransactionError as e:
+                logger.error("Rollback failed for %s: %s", self.client_address, e)
+
     def process_command(self, cmd: str) -> dict:
         """Process a client command and return a response as a dictionary."""
-        print(f"Processing command: '{cmd}'")
         try:
             if not cmd or cmd.isspace():
-                response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-                print(f"Invalid command, returning: {response}")
-                logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} > {cmd}\n{response['message']}")
+                response = _ERR_INVALID
+                logger.info("> %s\n%s", cmd, response['message'])
                 return response
 
             if not self.authenticated:
-                print("Client not authenticated, handling login command")
                 return self.handle_login_command(cmd)
 
-            parts = cmd.split(maxsplit=1)
-            command = parts[0].lower()
+            # Split at the first run of any whitespace, as the original str.split() parsing did
+            parts = cmd.split(None, 1)
+            command = parts[0]
             arg = parts[1] if len(parts) > 1 else ""
-            print(f"Parsed command: command='{command}', arg='{arg}'")
+            logger.debug("Parsed command: command='%s', arg='%s'", command, arg)
 
-            if command in self.DB_COMMANDS:
-                print(f"Executing DB command: {command}")
-                response = self.DB_COMMANDS[command](self, arg)
-                print(f"DB command response: {response}")
-                logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} > {cmd}\n{response['message']}")
+            # Commands are almost always sent in lowercase; only fold case on a miss
+            handler = self._commands.get(command) or self._commands.get(command.lower())
+            if handler is not None:
+                response = handler(arg)
+                logger.info("> %s\n%s", cmd, response['message'])
                 return response
             else:
-                print(f"Handling as collection operation: {cmd}")
                 response = self.handle_collection_operation(cmd)
-                print(f"Collection operation response: {response}")
                 if response["status"] == "success" and "data" in response:
-                    logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} > {cmd}\n{response['message']}\n{json.dumps(response['data'], indent=2)}")
+                    logger.info("> %s\n%s\n%s", cmd, response['message'], _format_logged_data(response['data']))
                 else:
-                    logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} > {cmd}\n{response['message']}")
+                    logger.info("> %s\n%s", cmd, response['message'])
                 return response
         except Exception as e:
-            print(f"Error processing command '{cmd}': {e}")
-            logger.error(f"Error processing command '{cmd}' from {self.client_address}: {e}")
+            logger.error("Error processing command '%s' from %s: %s", cmd, self.client_address, e)
             response = {"status": "error", "message": f"Invalid command. Use 'help' for available commands. Error: {e}"}
-            logger.info(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} > {cmd}\n{response['message']}")
-            print(f"Returning error response: {response}")
+            logger.info("> %s\n%s", cmd, response['message'])
             return response
 
     def handle_login_command(self, cmd: str) -> dict:
         """Authenticate client credentials."""
-        print(f"Handling login command: '{cmd}'")
         try:
-            parts = cmd.split(maxsplit=2)
-            if parts[0].lower() != "login" or len(parts) < 3:
-                response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-                print(f"Invalid login command, returning: {response}")
-                return response
+            # At most three words, split on any whitespace; the password is everything after the
+            # username, so it may itself contain spaces
+            parts = cmd.split(None, 2)
+            keyword = parts[0].lower()
+            if keyword == "auth":
+                if len(parts) == 2:
+                    return self.handle_auth_token(parts[1])
+                return _ERR_INVALID
+            if keyword != "login" or len(parts) < 3:
+                return _ERR_INVALID
             username, password = parts[1], parts[2]
-            print(f"Attempting login for username: '{username}'")
-            users = self.load_users()
-            if username in users and bcrypt.checkpw(password.encode('utf-8'), users[username].encode('utf-8')):
+            source = self.client_address[0]
+            if self.server.login_throttle.is_locked(source):
+                logger.warning("Login for '%s' from %s refused: locked out", username, self.client_address)
+                return _ERR_LOCKED_OUT
+            # Caps concurrent bcrypt work so a login flood can't starve other clients of CPU
+            with self.server.login_slots:
+                valid = self.auth.authenticate(username, password)
+            if valid:
+                self.server.login_throttle.reset(source)
                 self.authenticated = True
-                self.current_user = username
-                print(f"Login successful for '{username}'")
-                logger.info(f"User '{username}' logged in from {self.client_address}")
-                response = {"status": "success", "message": "Login successful"}
-                print(f"Returning: {response}")
+                self.current_user = sys.intern(username)
+                logger.info("User '%s' logged in from %s", username, self.client_address)
+                token = self.server.sessions.issue(username)
+                response = {"status": "success", "message": "Login successful", "token": token}
                 return response
             else:
-                print(f"Login failed for '{username}'")
-                logger.warning(f"Failed login attempt for '{username}' from {self.client_address}")
-                response = {"status": "error", "message": "Invalid credentials"}
-                print(f"Returning: {response}")
+                self.server.login_throttle.record_failure(source)
+                logger.warning("Failed login attempt for '%s' from %s", username, self.client_address)
+                response = _ERR_INVALID_CREDENTIALS
                 return response
         except Exception as e:
-            print(f"Error in login command: {e}")
+            logger.debug("Error in login command: %s", e)
             response = {"status": "error", "message": f"Invalid command. Use 'help' for available commands. Error: {e}"}
-            print(f"Returning: {response}")
             return response
 
+    def handle_auth_token(self, token: str) -> dict:
+        """Resume a session from a token issued by an earlier login, skipping bcrypt."""
+        username = self.server.sessions.resolve(token)
+        # The user may have been removed since the token was issued
+        if username is None or username not in self.auth.load_users():
+            logger.warning("Rejected session token from %s", self.client_address)
+            return _ERR_INVALID_TOKEN
+        self.authenticated = True
+        self.current_user = sys.intern(username)
+        logger.info("User '%s' resumed session from %s", username, self.client_address)
+        return {"status": "success", "message": "Login successful"}
+
     def handle_use(self, arg: str) -> dict:
         """Switch to a specified database for the client session."""
-        print(f"Handling 'use' command with arg: '{arg}'")
         db_name = arg.strip()
         if not db_name:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"Invalid db name, returning: {response}")
+            response = _ERR_INVALID
             return response
         if not self.authenticated:
-            response = {"status": "error", "message": "Please login first"}
-            print(f"Not authenticated, returning: {response}")
+            response = _ERR_NOT_LOGGED_IN
             return response
-        if not self.has_permission(self.current_user, db_name, "*", "read"):
+        if not self.auth.has_permission(self.current_user, db_name, "*", "read"):
             response = {"status": "error", "message": "Permission denied: No access to database"}
-            print(f"Permission denied, returning: {response}")
             return response
         try:
             with self.session_lock:
-                self.current_db = Database(db_name)
-                db_path = os.path.abspath(self.current_db.storage.db_path)
-                print(f"Switched to database '{db_name}' at '{db_path}'")
-                logger.info(f"Client {self.client_address} switched to database '{db_name}' at '{db_path}'")
+                # A new connection-local Database used to drop any open transaction; keep that behaviour
+                self._rollback_open_transaction("switching database")
+                self.current_db = self.server.get_database(db_name)
+                db_path = self.current_db.storage.abs_db_path
+                logger.info("Client %s switched to database '%s' at '%s'", self.client_address, db_name, db_path)
                 response = {"status": "success", "message": f"Switched to database '{db_name}', path: {db_path}"}
-                print(f"Returning: {response}")
                 return response
         except KiteDBError as e:
-            print(f"Use database failed: {e}")
-            logger.error(f"Use database failed for {self.client_address}: {e}")
+            logger.error("Use database failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
 
     def handle_list(self, arg: str) -> dict:
         """List all available databases."""
-        print(f"Handling 'list' command with arg: '{arg}'")
         try:
-            databases = []
             data_root = config.get("storage.data_root")
-            print(f"Listing databases in {data_root}")
-            for entry in os.listdir(data_root):
-                path = os.path.join(data_root, entry)
-                if os.path.isdir(path):
-                    databases.append(entry)
-            databases.sort()
+            databases = list_databases(data_root)
             response = {"status": "success", "data": databases, "message": "Databases listed"}
-            print(f"Returning: {response}")
             return response
         except Exception as e:
-            print(f"Error listing databases: {e}")
-            logger.error(f"Error listing databases for {self.client_address}: {e}")
+            logger.error("Error listing databases for %s: %s", self.client_address, e)
             response = {"status": "error", "message": f"Invalid command. Use 'help' for available commands. Error: {e}"}
-            print(f"Returning: {response}")
             return response
 
     def handle_create(self, arg: str) -> dict:
         """Create a new collection in the current database."""
-        print(f"Handling 'create' command with arg: '{arg}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
-        if not self.has_permission(self.current_user, self.current_db.name, "*", "create"):
+        if not self.auth.has_permission(self.current_user, self.current_db.name, "*", "create"):
             response = {"status": "error", "message": "Permission denied: No create access to database"}
-            print(f"Permission denied, returning: {response}")
             return response
         parts = arg.strip().split(maxsplit=1)
         collection_name = parts[0]
         schema = parts[1] if len(parts) > 1 else None
-        print(f"Collection name: '{collection_name}', schema: '{schema}'")
         if not collection_name:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"Invalid collection name, returning: {response}")
+            response = _ERR_INVALID
             return response
         try:
-            schema_dict = json.loads(schema) if schema else None
-            print(f"Parsed schema: {schema_dict}")
+            schema_dict = json_codec.loads(schema) if schema else None
+            logger.debug("Parsed schema: %s", schema_dict)
             self.current_db.create_collection(collection_name, schema_dict)
-            print(f"Created collection '{collection_name}'")
-            logger.info(f"Client {self.client_address} created collection '{collection_name}' in '{self.current_db.name}'")
+            logger.info(
+                "Client %s created collection '%s' in '%s'",
+                self.client_address, collection_name, self.current_db.name,
+            )
             response = {"status": "success", "message": f"Collection '{collection_name}' created"}
-            print(f"Returning: {response}")
             return response
         except KiteDBError as e:
-            print(f"Create collection failed: {e}")
-            logger.error(f"Create collection failed for {self.client_address}: {e}")
+            logger.error("Create collection failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
-        except json.JSONDecodeError as e:
-            print(f"Invalid schema JSON: {e}")
-            logger.error(f"Invalid schema JSON for {self.client_address}: {e}")
+        except json_codec.JSONDecodeError as e:
+            logger.error("Invalid schema JSON for %s: %s", self.client_address, e)
             response = {"status": "error", "message": f"Invalid command. Use 'help' for available commands. Error: {e}"}
-            print(f"Returning: {response}")
             return response
 
     def handle_delete(self, arg: str) -> dict:
         """Delete a collection from the current database."""
-        print(f"Handling 'delete' command with arg: '{arg}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
-        if not self.has_permission(self.current_user, self.current_db.name, arg.strip(), "delete"):
+        if not self.auth.has_permission(self.current_user, self.current_db.name, arg.strip(), "delete"):
             response = {"status": "error", "message": "Permission denied: No delete access to collection"}
-            print(f"Permission denied, returning: {response}")
             return response
         collection_name = arg.strip()
         if not collection_name:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"Invalid collection name, returning: {response}")
+            response = _ERR_INVALID
             return response
         try:
             result = self.current_db.drop_collection(collection_name)
             message = "Collection deletion logged" if result == "logged" else f"Collection '{collection_name}' deleted"
-            print(f"Delete result: {message}")
-            logger.info(f"Client {self.client_address} deleted collection '{collection_name}' from '{self.current_db.name}'")
+            logger.info(
+                "Client %s deleted collection '%s' from '%s'",
+                self.client_address, collection_name, self.current_db.name,
+            )
             response = {"status": "success", "message": message}
-            print(f"Returning: {response}")
             return response
         except KiteDBError as e:
-            print(f"Delete collection failed: {e}")
-            logger.error(f"Delete collection failed for {self.client_address}: {e}")
+            logger.error("Delete collection failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
 
     def handle_begin(self, arg: str) -> dict:
         """Start a new transaction in the current database."""
-        print(f"Handling 'begin' command with arg: '{arg}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
         try:
             self.current_db.begin_transaction()
-            print("Transaction begun")
-            logger.info(f"Client {self.client_address} began transaction in '{self.current_db.name}'")
-            response = {"status": "success", "message": "Transaction begun"}
-            print(f"Returning: {response}")
+            logger.info("Client %s began transaction in '%s'", self.client_address, self.current_db.name)
+            response = _OK_TRANSACTION_BEGUN
             return response
         except KiteDBError as e:
-            print(f"Begin transaction failed: {e}")
-            logger.error(f"Begin transaction failed for {self.client_address}: {e}")
+            logger.error("Begin transaction failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
 
     def handle_commit(self, arg: str) -> dict:
         """Commit the active transaction in the current database."""
-        print(f"Handling 'commit' command with arg: '{arg}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
         if not self.current_db.transaction or not self.current_db.transaction.active:
-            response = {"status": "error", "message": "No active transaction"}
-            print(f"No active transaction, returning: {response}")
+            response = _ERR_NO_TRANSACTION
             return response
         try:
             self.current_db.transaction.commit()
-            print("Transaction committed")
-            logger.info(f"Client {self.client_address} committed transaction in '{self.current_db.name}'")
-            response = {"status": "success", "message": "Transaction committed"}
-            print(f"Returning: {response}")
+            logger.info("Client %s committed transaction in '%s'", self.client_address, self.current_db.name)
+            response = _OK_TRANSACTION_COMMITTED
             return response
         except TransactionError as e:
-            print(f"Commit transaction failed: {e}")
-            logger.error(f"Commit transaction failed for {self.client_address}: {e}")
+            logger.error("Commit transaction failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
 
     def handle_rollback(self, arg: str) -> dict:
         """Roll back the active transaction in the current database."""
-        print(f"Handling 'rollback' command with arg: '{arg}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
         if not self.current_db.transaction or not self.current_db.transaction.active:
-            response = {"status": "error", "message": "No active transaction"}
-            print(f"No active transaction, returning: {response}")
+            response = _ERR_NO_TRANSACTION
             return response
         try:
             self.current_db.transaction.rollback()
-            print("Transaction rolled back")
-            logger.info(f"Client {self.client_address} rolled back transaction in '{self.current_db.name}'")
-            response = {"status": "success", "message": "Transaction rolled back"}
-            print(f"Returning: {response}")
+            logger.info("Client %s rolled back transaction in '%s'", self.client_address, self.current_db.name)
+            response = _OK_TRANSACTION_ROLLED_BACK
             return response
         except TransactionError as e:
-            print(f"Rollback transaction failed: {e}")
-            logger.error(f"Rollback transaction failed for {self.client_address}: {e}")
+            logger.error("Rollback transaction failed for %s: %s", self.client_address, e)
             response = {"status": "error", "message": str(e)}
-            print(f"Returning: {response}")
             return response
 
     def handle_exit(self, arg: str) -> dict:
         """Close the client connection."""
-        print(f"Handling 'exit' command with arg: '{arg}'")
-        logger.info(f"Client {self.client_address} requested exit")
-        if self.current_db and self.current_db.transaction and self.current_db.transaction.active:
-            try:
-                self.current_db.transaction.rollback()
-                print(f"Rolled back transaction for exiting client")
-                logger.info(f"Rolled back transaction for exiting client {self.client_address}")
-            except TransactionError as e:
-                print(f"Rollback failed: {e}")
-                logger.error(f"Rollback failed for {self.client_address}: {e}")
-        response = {"status": "success", "message": "Connection closed"}
-        print(f"Returning: {response}")
+        logger.info("Client %s requested exit", self.client_address)
+        self._rollback_open_transaction("exit")
+        response = _OK_CONNECTION_CLOSED
         return response
 
     def handle_help(self, arg: str) -> dict:
         """Return the help message for client reference."""
-        print(f"Handling 'help' command with arg: '{arg}'")
-        from main import HELP_MESSAGE
-        response = {"status": "success", "message": HELP_MESSAGE}
-        print(f"Returning: {response}")
-        return response
+        return _OK_HELP
 
     def handle_collection_operation(self, cmd: str) -> dict:
         """Handle collection operations like add, find, update, or delete."""
-        print(f"Handling collection operation: '{cmd}'")
         if not self.current_db:
-            response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-            print(f"No current db, returning: {response}")
+            response = _ERR_INVALID
             return response
         try:
             parsed = QueryParser.parse(cmd)
-            print(f"Parsed query: {parsed}")
             op = parsed["operation"]
             collection_name = parsed["collection"]
-            print(f"Operation: '{op}', Collection: '{collection_name}'")
-            if not self.has_permission(self.current_user, self.current_db.name, collection_name, op):
-                print(f"Permission denied for operation '{op}' on '{collection_name}'")
-                logger.warning(f"Permission denied for user '{self.current_user}' on '{cmd}' from {self.client_address}")
-                response = {"status": "error", "message": "Permission denied"}
-                print(f"Returning: {response}")
+            if not self.auth.has_permission(self.current_user, self.current_db.name, collection_name, op):
+                logger.warning(
+                    "Permission denied for user '%s' on '%s' from %s",
+                    self.current_user, cmd, self.client_address,
+                )
+                response = _ERR_PERMISSION_DENIED
                 return response
             query = parsed.get("query", {})
             data = parsed.get("data", {})
-            print(f"Query: {query}, Data: {data}")
 
-            if op not in ["add", "find", "update", "delete"]:
-                print(f"Unknown operation: '{op}'")
-                logger.warning(f"Unknown operation attempted by {self.client_address}: {op}")
-                response = {"status": "error", "message": "Invalid command. Use 'help' for available commands."}
-                print(f"Returning: {response}")
+            handler = self.COLLECTION_OPS.get(op)
+            if handler is None:
+                logger.warning("Unknown operation attempted by %s: %s", self.client_address, op)
+                response = _ERR_INVALID
                 return response
 
             coll = self.current_db.get_collection(collection_name)
-            print(f"Retrieved collection '{collection_name}'")
             logger.info(
-                f"Client {self.client_address} executing {op} on '{collection_name}': query={query}, data={data}"
+                "Client %s executing %s on '%s': query=%s, data=%s",
+                self.client_address, op, collection_name, query, data,
             )
 
-            if op == "add":
-                print(f"Inserting data: {data}")
-                res = coll.insert(data)
-                print(f"Insert result: {res}")
-                if res == "logged":
-                    response = {"status": "success", "message": "Insertion logged"}
-                    print(f"Returning: {response}")
-                    return response
-                else:
-                    message = (
-                        f"Inserted {len(res)} documents with IDs: {res}"
-                        if isinstance(res, list)
-                        else f"Inserted document with ID: {res}"
-                    )
-                    response = {"status": "success", "message": message, "data": res}
-                    print(f"Returning: {response}")
-                    return response
-            elif op == "find":
-                print(f"Finding documents with query: {query}")
-                res = coll.find(query)
-                print(f"Find result: {res}")
-                if not res:
-                    response = {"status": "success", "message": "No documents found", "data": []}
-                    print(f"Returning: {response}")
-                    return response
-                response = {"status": "success", "message": f"Found {len(res)} documents", "data": res}
-                print(f"Returning: {response}")
-                return response
-            elif op == "update":
-                print(f"Updating documents with query: {query}, data: {data}")
-                res = coll.update(query, data)
-                print(f"Update result: {res}")
-                if res == "logged":
-                    response = {"status": "success", "message": "Update logged"}
-                    print(f"Returning: {response}")
-                    return response
-                response = {"status": "success", "message": f"Updated {res} documents", "data": res}
-                print(f"Returning: {response}")
-                return response
-            elif op == "delete":
-                print(f"Deleting documents with query: {query}")
-                res = coll.delete(query)
-                print(f"Delete result: {res}")
-                if res == "logged":
-                    response = {"status": "success", "message": "Delete logged"}
-                    print(f"Returning: {response}")
-                    return response
-                response = {"status": "success", "message": f"Deleted {res} documents", "data": res}
-                print(f"Returning: {response}")
-                return response
+            return handler(self, coll, query, data)
         except ValidationError as e:
-            print(f"Validation error: {e}")
-            logger.error(f"Validation error in command '{cmd}' from {self.client_address}: {e}")
+            logger.error("Validation error in command '%s' from %s: %s", cmd, self.client_address, e)
             response = {"status": "error", "message": f"Validation error: {e}"}
-            print(f"Returning: {response}")
             return response
         except KiteDBError as e:
-            print(f"Database error: {e}")
-            logger.error(f"Database error in command '{cmd}' from {self.client_address}: {e}")
+            logger.error("Database error in command '%s' from %s: %s", cmd, self.client_address, e)
             response = {"status": "error", "message": f"Database error: {e}"}
-            print(f"Returning: {response}")
             return response
         except Exception as e:
-            print(f"Unexpected error: {e}")
-            logger.error(f"Unexpected error in command '{cmd}' from {self.client_address}: {e}")
+            logger.error("Unexpected error in command '%s' from %s: %s", cmd, self.client_address, e)
             response = {"status": "error", "message": f"Invalid command. Use 'help' for available commands. Error: {e}"}
-            print(f"Returning: {response}")
             return response
 
+    def _op_add(self, coll, query, data) -> dict:
+        res = coll.insert(data)
+        logger.debug("Insert result: %s", res)
+        if res == "logged":
+            return _OK_INSERT_LOGGED
+        message = (
+            f"Inserted {len(res)} documents with IDs: {res}"
+            if isinstance(res, list)
+            else f"Inserted document with ID: {res}"
+        )
+        return {"status": "success", "message": message, "data": res}
+
+    def _op_find(self, coll, query, data) -> dict:
+        # Copies, not the stored documents: the database is shared with other connections, and
+        # the response is encoded and logged after the read lock is released, while another
+        # connection's update may be changing those documents in place
+        res = coll.find(query)
+        logger.debug("Find result: %s", res)
+        if not res:
+            return {"status": "success", "message": "No documents found", "data": []}
+        return {"status": "success", "message": f"Found {len(res)} documents", "data": res}
+
+    def _op_update(self, coll, query, data) -> dict:
+        res = coll.update(query, data)
+        logger.debug("Update result: %s", res)
+        if res == "logged":
+            return _OK_UPDATE_LOGGED
+        return {"status": "success", "message": f"Updated {res} documents", "data": res}
+
+    def _op_delete(self, coll, query, data) -> dict:
+        res = coll.delete(query)
+        logger.debug("Delete result: %s", res)
+        if res == "logged":
+            return _OK_DELETE_LOGGED
+        return {"status": "success", "message": f"Deleted {res} documents", "data": res}
+
     DB_COMMANDS = {
         "login": handle_login_command,
         "use": handle_use,
@@ -568,14 +490,64 @@ class KiteDBRequestHandler(socketserver.BaseRequestHandler):
         "help": handle_help,
     }
 
+    COLLECTION_OPS = {
+        "add": _op_add,
+        "find": _op_find,
+        "update": _op_update,
+        "delete": _op_delete,
+    }
+
 class KiteDBServer(socketserver.ThreadingTCPServer):
     """Multi-threaded TCP server for KiteDB."""
     allow_reuse_address = True
 
     def __init__(self, server_address, handler_class):
         print(f"Starting KiteDB server on {server_address}")
+        self.auth = AuthManager(perm_map=SERVER_PERM_MAP)
+        # Parse users and ACL up front so the first client doesn't pay for it
+        self.auth.load_users()
+        self.auth.load_acl()
+        self.sessions = SessionStore(config.get("auth.session_ttl", 3600))
+        self.login_throttle = LoginThrottle(
+            config.get("auth.max_failed_logins", 5), config.get("auth.lockout_seconds", 30)
+        )
+        self.login_slots = threading.BoundedSemaphore(
+            config.get("auth.max_concurrent_logins", 0) or os.cpu_count() or 1
+        )
+        # Open databases shared by all connections; each is loaded from disk once
+        self._databases = {}
+        self._databases_lock = threading.Lock()
+        # Connections are served by a fixed set of reusable threads instead of one new thread each
+        self._workers = ThreadPoolExecutor(
+            max_workers=config.get("server.max_workers", 64), thread_name_prefix="kitedb-client"
+        )
         super().__init__(server_address, handler_class)
-        logger.info(f"KiteDB server started on {server_address}")
+        logger.info("KiteDB server started on %s", server_address)
+
+    def get_database(self, db_name: str) -> Database:
+        """Return the shared Database for db_name, loading it on first use."""
+        db = self._databases.get(db_name)
+        if db is None:
+            with self._databases_lock:
+                db = self._databases.get(db_name)
+                if db is None:
+                    db = self._databases[db_name] = Database(db_name)
+        return db
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a pooled worker; it waits in the queue if all workers are busy."""
+        self._workers.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        """Close the listening socket and wait for in-flight connections to finish."""
+        super().server_close()
+        self._workers.shutdown(wait=self.block_on_close)
+        # Idle now, so each database's journal can be folded into a snapshot for the next start
+        for db_name, db in list(self._databases.items()):
+            try:
+                db.flush()
+            except KiteDBError as e:
+                logger.error("Flush database '%s' failed: %s", db_name, e)
 
 def run_server():
     """Start the KiteDB server using configured host and port."""
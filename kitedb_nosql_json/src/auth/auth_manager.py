@@ -0,0 +1,233 @@
+import os
+import sys
+from contextlib import contextmanager
+from threading import RLock, local
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config import config
+from src import json_codec
+
+# Operation-to-permission mapping used when no explicit permission matches
+DEFAULT_PERM_MAP = {"find": "read", "add": "write", "update": "update", "delete": "delete", "create": "create"}
+
+# bcrypt hash of the default "admin" password, precomputed so a fresh install doesn't pay for hashing
+_DEFAULT_ADMIN_HASH = b"$2b$10$TM91uJatZyEsz2A5L39wyuu5V2wx8RGXcByWEtPujR19fPrhR/VUe"
+
+# bcrypt hash of "", at the default cost, compared against for unknown users so a failed
+# login costs the same either way; precomputed so nothing is hashed at startup or first use
+_DUMMY_HASH = b"$2b$10$oQcaM/EahcHHjT0MRh.t2O7BK92IZ03OZjiwGChRtPkmKnAURoLXq"
+
+
+def _read_json(path: str) -> Tuple[Any, Tuple[int, int]]:
+    """Decode a JSON file, returning its contents and the (mtime_ns, size) of what was read."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        return json_codec.loads(f.read()), (st.st_mtime_ns, st.st_size)
+
+
+def _atomic_write_json(path: str, obj: Any) -> None:
+    """Write obj as JSON to a temporary file, then rename it over path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json_codec.dumps_pretty_bytes(obj))
+    os.replace(tmp_path, path)
+
+
+class AuthManager:
+    """User credentials and access-control lists shared by the console and the server."""
+
+    __slots__ = (
+        "users_file", "acl_file", "perm_map", "users", "acl",
+        "_users_stamp", "_acl_stamp", "_perm_index", "acl_version", "_pinned", "_lock",
+        "_dummy_hash",
+    )
+
+    def __init__(self, users_file: str = "users.json", acl_file: str = "acl.json",
+                 perm_map: Optional[Dict[str, str]] = None):
+        self.users_file = users_file
+        self.acl_file = acl_file
+        self.perm_map = perm_map if perm_map is not None else DEFAULT_PERM_MAP
+        self.users = {}
+        self.acl = {}
+        # (mtime_ns, size) of each file as last loaded or saved; None until then
+        self._users_stamp = None
+        self._acl_stamp = None
+        # user -> (denied dbs, readable dbs, global ops, (db, collection, op) grants)
+        self._perm_index = {}
+        # Bumped whenever the ACL index is rebuilt
+        self.acl_version = 0
+        # Snapshot pins are per thread so a shared manager can serve many connections
+        self._pinned = local()
+        # Serializes reloads and saves; readers only ever swap in fully built dicts
+        self._lock = RLock()
+
+    @staticmethod
+    def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+        """Return a cheap change marker for a file, or None if it doesn't exist."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load_users(self) -> dict:
+        """Load users from users.json or create default if file doesn't exist."""
+        if self._users_stamp is not None and self._file_stamp(self.users_file) == self._users_stamp:
+            return self.users
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._users_stamp is not None and self._file_stamp(self.users_file) == self._users_stamp:
+                return self.users
+            try:
+                users, stamp = _read_json(self.users_file)
+            except FileNotFoundError:
+                self.users = {"admin": _DEFAULT_ADMIN_HASH}
+                self.save_users()
+                return self.users
+            # Hashes are kept as bytes so checks can hand them straight to bcrypt
+            self.users = {name: hashed.encode('utf-8') for name, hashed in users.items()}
+            self._users_stamp = stamp
+            return self.users
+
+    def save_users(self):
+        """Save users to users.json."""
+        with self._lock:
+            stored = {name: hashed.decode('utf-8') for name, hashed in self.users.items()}
+            _atomic_write_json(self.users_file, stored)
+            self._users_stamp = self._file_stamp(self.users_file)
+
+    def load_acl(self) -> dict:
+        """Load ACL from acl.json or create default if file doesn't exist."""
+        if self._acl_stamp is not None and self._file_stamp(self.acl_file) == self._acl_stamp:
+            return self.acl
+        with self._lock:
+            if self._acl_stamp is not None and self._file_stamp(self.acl_file) == self._acl_stamp:
+                return self.acl
+            try:
+                acl, stamp = _read_json(self.acl_file)
+            except FileNotFoundError:
+                # Default ACL only needs to initialize for non-admin users; admin gets all permissions implicitly
+                self.acl = {
+                    "admin": {
+                        "databases": {}
+                    }
+                }
+                self.save_acl()
+                return self.acl
+            self.acl = acl
+            self._index_acl()
+            self._acl_stamp = stamp
+            return self.acl
+
+    def save_acl(self):
+        """Save ACL to acl.json."""
+        with self._lock:
+            _atomic_write_json(self.acl_file, self.acl)
+            self._index_acl()
+            self._acl_stamp = self._file_stamp(self.acl_file)
+
+    def _index_acl(self):
+        """Flatten the ACL into per-user lookup tables used by has_permission."""
+        # Operations granted by each permission through perm_map, e.g. 'read' -> ['find']
+        ops_for_perm = {}
+        for op, perm in self.perm_map.items():
+            ops_for_perm.setdefault(perm, []).append(op)
+        index = {}
+        # Names are interned so lookups with interned session values short-circuit on identity
+        intern = sys.intern
+        for user, user_perms in self.acl.items():
+            db_perms = user_perms.get("databases", {})
+            denied, readable, grants = set(), set(), set()
+            for db_name, db_perm in db_perms.items():
+                db_name = intern(db_name)
+                if db_perm.get("access") == "denied":
+                    denied.add(db_name)
+                for coll_name, perms in db_perm.get("collections", {}).items():
+                    coll_name = intern(coll_name)
+                    if "read" in perms:
+                        readable.add(db_name)
+                    for perm in perms:
+                        perm = intern(perm)
+                        grants.add((db_name, coll_name, perm))
+                        for op in ops_for_perm.get(perm, ()):
+                            grants.add((db_name, coll_name, op))
+            global_ops = frozenset(db_perms.get("*", {}).get("collections", {}).get("*", ()))
+            index[intern(user)] = (frozenset(denied), frozenset(readable), global_ops, frozenset(grants))
+        self._perm_index = index
+        self.acl_version += 1
+
+    @contextmanager
+    def snapshot(self):
+        """Check acl.json once and reuse that view for every permission check in the block."""
+        self.load_acl()
+        self._pinned.active = True
+        try:
+            yield self.acl_version
+        finally:
+            self._pinned.active = False
+
+    @staticmethod
+    def hash_password(password: str) -> bytes:
+        """Hash a password using bcrypt with the configured cost factor."""
+        import bcrypt
+
+        rounds = config.get("auth.bcrypt_rounds", 10)
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds))
+
+    @staticmethod
+    def check_password(password: str, hashed: bytes) -> bool:
+        """Check if a password matches the hashed version."""
+        import bcrypt
+
+        return bcrypt.checkpw(password.encode('utf-8'), hashed)
+
+    def authenticate(self, username: str, password: str) -> bool:
+        """Verify credentials, doing the same bcrypt work whether or not the user exists."""
+        stored = self.load_users().get(username)
+        known = stored is not None
+        if not known:
+            stored = _DUMMY_HASH
+        # One compare on every path; the result only counts for a user that exists
+        return self.check_password(password, stored) and known
+
+    def has_permission(self, user: str, db_name: str, collection_name: str, operation: str) -> bool:
+        """Check if the user has the required permission."""
+        # Admin has all permissions by default
+        if user == "admin":
+            return True
+
+        # Picks up the latest permissions; only re-parses acl.json when it changed on disk
+        if not getattr(self._pinned, "active", False):
+            self.load_acl()
+        perms = self._perm_index.get(user)
+        if perms is None:
+            return False
+        denied, readable, global_ops, grants = perms
+
+        # Explicitly denied databases win over any grant
+        if db_name in denied:
+            return False
+        if operation in global_ops:
+            return True
+
+        # For database-level access (e.g., 'use'), allow if read permission exists on any collection
+        if operation == "read" and collection_name == "*":
+            return db_name in readable
+
+        # Grants already include operations implied through perm_map
+        return (db_name, "*", operation) in grants or (db_name, collection_name, operation) in grants
+
+    def readable_databases(self, user: str, db_names: Iterable[str]) -> List[str]:
+        """Filter db_names down to those the user may open, preserving their order."""
+        if user == "admin":
+            return list(db_names)
+        if not getattr(self._pinned, "active", False):
+            self.load_acl()
+        perms = self._perm_index.get(user)
+        if perms is None:
+            return []
+        denied, readable, global_ops, _ = perms
+        # Same outcome as has_permission(user, db, "*", "read") for each name
+        if "read" in global_ops:
+            return [db for db in db_names if db not in denied]
+        allowed = readable - denied
+        return [db for db in db_names if db in allowed]
@@ -0,0 +1,42 @@
+import time
+from threading import Lock
+from typing import Hashable
+
+
+class LoginThrottle:
+    """Locks out a login source after repeated failures so guessing can't drive unbounded bcrypt work."""
+
+    def __init__(self, max_failures: int, lockout: float):
+        self.max_failures = max_failures
+        self.lockout = lockout
+        # source -> (consecutive failures, monotonic time of the last one)
+        self._failures = {}
+        self._lock = Lock()
+
+    def is_locked(self, source: Hashable) -> bool:
+        """Return True while a source has too many recent failures to be allowed another attempt."""
+        with self._lock:
+            entry = self._failures.get(source)
+            if entry is None:
+                return False
+            count, last = entry
+            if time.monotonic() - last >= self.lockout:
+                del self._failures[source]
+                return False
+            return count >= self.max_failures
+
+    def record_failure(self, source: Hashable):
+        """Count a failed attempt for a source."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) > 1024:
+                # Drop stale entries so sources that never come back don't accumulate
+                for key in [k for k, (_, last) in self._failures.items() if now - last >= self.lockout]:
+                    del self._failures[key]
+            count, _ = self._failures.get(source, (0, now))
+            self._failures[source] = (count + 1, now)
+
+    def reset(self, source: Hashable):
+        """Forget past failures after a successful login."""
+        with self._lock:
+            self._failures.pop(source, None)
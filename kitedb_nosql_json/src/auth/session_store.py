@@ -0,0 +1,37 @@
+import secrets
+import time
+from threading import Lock
+from typing import Optional
+
+
+class SessionStore:
+    """Short-lived session tokens that let returning clients skip bcrypt verification."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = Lock()
+
+    def issue(self, user: str) -> str:
+        """Create a new token for an authenticated user."""
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            # Logins are rare compared to commands, so expired tokens are swept here
+            expired = [t for t, (_, expiry) in self._sessions.items() if expiry <= now]
+            for t in expired:
+                del self._sessions[t]
+            self._sessions[token] = (user, now + self.ttl)
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        """Return the user owning a valid token, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            user, expiry = entry
+            if expiry <= time.monotonic():
+                del self._sessions[token]
+                return None
+            return user
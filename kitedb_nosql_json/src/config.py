@@ -3,6 +3,13 @@ import os
 import logging
 from typing import Dict, Any
 from src.logging.logger import Logger
+from src import json_codec
+
+try:
+    # LibYAML's C loader parses the same safe subset many times faster
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 temp_logger = logging.getLogger("temp_config")
 temp_logger.setLevel(logging.INFO)
@@ -16,12 +23,21 @@ class Config:
         "storage": {
             "data_root": os.path.join(os.getcwd(), "db"),
             "chunk_size": 1000,
+            "compact_every": 1000,
+            "journal_fsync": False,
             "encryption_key": os.environ.get(
                 "KITEDB_ENCRYPTION_KEY", "thisisasecretkey"
             ),
         },
         "logging": {"level": "INFO", "directory": os.path.join(os.getcwd(), "logs")},
-        "server": {"host": "localhost", "port": 5432},
+        "server": {"host": "localhost", "port": 5432, "max_workers": 64},
+        "auth": {
+            "bcrypt_rounds": 10,
+            "session_ttl": 3600,
+            "max_failed_logins": 5,
+            "lockout_seconds": 30,
+            "max_concurrent_logins": 0,
+        },
     }
 
     def __init__(self, config_file: str = "config.yaml"):
@@ -33,8 +49,7 @@ class Config:
         """Load and merge configuration from a YAML file into the default config."""
         try:
             if os.path.exists(config_file):
-                with open(config_file, "r") as f:
-                    user_config = yaml.safe_load(f) or {}
+                user_config = self._read_user_config(config_file)
                 self._merge_config(self.config, user_config)
                 temp_logger.info(f"Loaded configuration from {config_file}")
             else:
@@ -45,6 +60,31 @@ class Config:
             temp_logger.error(f"Failed to load config: {e}")
             raise ValueError(f"Invalid configuration: {e}")
 
+    @staticmethod
+    def _read_user_config(config_file: str) -> Dict:
+        """Parse config_file, reusing a JSON sidecar of the last parse while the file is unchanged."""
+        st = os.stat(config_file)
+        key = [st.st_mtime_ns, st.st_size]
+        cache_file = config_file + ".cache.json"
+        try:
+            with open(cache_file, "rb") as f:
+                cached = json_codec.loads(f.read())
+            if cached.get("key") == key:
+                return cached["config"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        with open(config_file, "r") as f:
+            user_config = yaml.load(f, Loader=_YamlLoader) or {}
+        try:
+            tmp_file = cache_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(json_codec.dumps_bytes({"key": key, "config": user_config}))
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError):
+            # Read-only directories and values JSON can't hold (e.g. YAML dates) just skip the cache
+            pass
+        return user_config
+
     def _merge_config(self, default: Dict, user: Dict) -> None:
         """Recursively merge user configuration into the default configuration."""
         for key, value in user.items():
@@ -1,17 +1,143 @@
-from threading import Lock
-from typing import Dict, List, Any
+import json
+import sys
+from collections import OrderedDict
+from itertools import compress
+from typing import Dict, List, Any, Callable, NamedTuple, Optional, Tuple
 from src.config import logger
 from src.core.exceptions import ValidationError, KiteDBError
 from src.query.query_parser import QueryParser
 
+# Compiled schema validators shared across collections, keyed by canonical schema JSON
+_VALIDATOR_CACHE: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+
+# Deletes removing at most this many documents close the gaps in place; beyond it a
+# single filtered copy is cheaper than shifting the tail once per removal
+_DELETE_IN_PLACE = 32
+
+# Scanning queries whose results each collection remembers, least recently used dropped first
+_QUERY_CACHE_SIZE = 128
+
+
+class QueryPlan(NamedTuple):
+    """How a query will be answered: kind is "empty", "indexed_eq", "indexed", "indexed_range" or "scan".
+
+    "indexed" narrows the documents to those matching every (field, value) in pairs
+    through the index, then checks the full query against just those. "indexed_range"
+    answers numeric bounds on one field (value holds the condition) from the index's
+    sorted keys, scanning instead if the field holds anything but numbers.
+    """
+
+    kind: str
+    field: Optional[str] = None
+    value: Any = None
+    pairs: Tuple[Tuple[str, Any], ...] = ()
+
+
+# Conditions that can be checked against any value without raising
+_SAFE_OPERATORS = frozenset(("$eq", "$ne"))
+# Conditions a field's sorted keys can answer
+_RANGE_OPERATORS = frozenset(("$gt", "$gte", "$lt", "$lte"))
+
+_EMPTY_PLAN = QueryPlan("empty")
+_SCAN_PLAN = QueryPlan("scan")
+
+
+def _index_pairs(query: Dict[str, Any], pairs: List[Tuple[str, Any]]) -> bool:
+    """Collect into pairs the top-level (field, value) equalities every match must satisfy.
+
+    Returns False for a query the index can't narrow without changing its outcome: $or
+    and $not, and ordering or unknown operators, which can raise on a document the
+    narrowed scan would skip.
+    """
+    for key, cond in query.items():
+        if key == "$and":
+            if not isinstance(cond, list) or not cond:
+                return False
+            for c in cond:
+                if not isinstance(c, dict) or not c or not _index_pairs(c, pairs):
+                    return False
+        elif key.startswith("$"):
+            return False
+        elif isinstance(cond, dict):
+            if not cond or not _SAFE_OPERATORS.issuperset(cond):
+                return False
+            # Indexes cover top-level fields only, so dotted paths are left to the check
+            if "$eq" in cond and "." not in key:
+                pairs.append((key, cond["$eq"]))
+        elif "." not in key:
+            pairs.append((key, cond))
+    return True
+
+
+def plan_query(query: Dict[str, Any]) -> QueryPlan:
+    """Classify a query in one pass so callers dispatch without re-inspecting it.
+
+    Not memoized: a hashable key for the query dict costs more to build than these checks.
+    """
+    if not query:
+        return _EMPTY_PLAN
+    if len(query) == 1:
+        field = next(iter(query))
+        if not field.startswith("$") and "." not in field:
+            cond = query[field]
+            if isinstance(cond, dict):
+                if len(cond) == 1 and "$eq" in cond:
+                    return QueryPlan("indexed_eq", field, cond["$eq"])
+                if cond and _RANGE_OPERATORS.issuperset(cond):
+                    return QueryPlan("indexed_range", field, cond)
+            else:
+                # A bare value is an equality too; the index holds exactly the documents whose
+                # value compares equal, so there is nothing left to check
+                return QueryPlan("indexed_eq", field, cond)
+    pairs = []
+    if _index_pairs(query, pairs) and pairs:
+        return QueryPlan("indexed", pairs=tuple(pairs))
+    return _SCAN_PLAN
+
+
+def _query_key(query: Dict[str, Any]) -> Optional[str]:
+    """Return the JSON of a query for the find cache, or None if it has no JSON form."""
+    # Key order is kept: conditions are checked in order, and $or ends a query early, so two
+    # queries that differ only in order can match differently or raise where the other doesn't
+    try:
+        return json.dumps(query)
+    except (TypeError, ValueError):
+        return None
+
+
+def intern_keys(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of doc whose top-level keys are interned strings.
+
+    Every document of a collection then shares one string object per field name, and
+    lookups with an interned key find it by identity without comparing characters.
+    """
+    intern = sys.intern
+    return {intern(k) if type(k) is str else k: v for k, v in doc.items()}
+
+
+def _accept_any(doc: Dict[str, Any]) -> None:
+    """Validator for collections without a schema."""
+
 
 class Collection:
+    # Schema type names and the Python types they validate against
+    _TYPE_MAP = {
+        "str": str,
+        "int": int,
+        "float": float,
+        "bool": bool,
+        "list": list,
+        "dict": dict,
+    }
+
     def __init__(self, db: "Database", name: str):
         self.db = db
         self.name = name
-        self.lock = Lock()
+        # Shared with the database, whose saves and DDL take the same lock
+        self.lock = db.data_lock
 
-    def _map_type(self, type_name: str) -> type:
+    @staticmethod
+    def _map_type(type_name: str) -> type:
         """Map string type names to Python types.
 
         Args:
@@ -23,17 +149,57 @@ class Collection:
         Raises:
             ValidationError: If the type_name is not found in the type map.
         """
-        type_map = {
-            "str": str,
-            "int": int,
-            "float": float,
-            "bool": bool,
-            "list": list,
-            "dict": dict,
-        }
-        if type_name not in type_map:
+        field_type = Collection._TYPE_MAP.get(type_name)
+        if field_type is None:
             raise ValidationError(f"Unknown type in schema: {type_name}")
-        return type_map[type_name]
+        return field_type
+
+    @staticmethod
+    def compile_schema(schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], None]:
+        """Compile a schema into a reusable validator, memoized by schema content.
+
+        Args:
+            schema (Dict[str, Any]): The collection schema with a "fields" mapping.
+
+        Returns:
+            Callable[[Dict[str, Any]], None]: A validator raising ValidationError on mismatch.
+
+        Raises:
+            ValidationError: If the schema references an unknown type.
+        """
+        key = json.dumps(schema or {}, sort_keys=True)
+        validator = _VALIDATOR_CACHE.get(key)
+        if validator is not None:
+            return validator
+
+        if not schema:
+            _VALIDATOR_CACHE[key] = _accept_any
+            return _accept_any
+
+        required_fields = schema.get("fields", {})
+        # Resolved once: a flat tuple to walk per document and a frozenset for the extra-field check
+        field_types = tuple(
+            (field, type_name, Collection._map_type(type_name))
+            for field, type_name in required_fields.items()
+        )
+        allowed = frozenset(required_fields)
+
+        def validator(doc: Dict[str, Any]) -> None:
+            for field, type_name, field_type in field_types:
+                if field not in doc:
+                    raise ValidationError(f"Missing required field: {field}")
+                if not isinstance(doc[field], field_type):
+                    raise ValidationError(
+                        f"Field {field} must be of type {type_name}, got {type(doc[field]).__name__}"
+                    )
+            if not allowed.issuperset(doc):
+                # Only walk the document to name the first offending field
+                for field in doc:
+                    if field not in allowed:
+                        raise ValidationError(f"Unexpected field in document: {field}")
+
+        _VALIDATOR_CACHE[key] = validator
+        return validator
 
     def validate_schema(self, doc: Dict[str, Any]):
         """Validate a document against the collection's schema.
@@ -44,21 +210,16 @@ class Collection:
         Raises:
             ValidationError: If the document does not match the schema requirements.
         """
-        schema = self.db.schemas.get(self.name, {})
-        if not schema:
-            return
-        required_fields = schema.get("fields", {})
-        for field, type_name in required_fields.items():
-            if field not in doc:
-                raise ValidationError(f"Missing required field: {field}")
-            field_type = self._map_type(type_name)
-            if not isinstance(doc[field], field_type):
-                raise ValidationError(
-                    f"Field {field} must be of type {type_name}, got {type(doc[field]).__name__}"
-                )
-        for field in doc:
-            if field not in required_fields:
-                raise ValidationError(f"Unexpected field in document: {field}")
+        self._validator()(doc)
+
+    def _validator(self) -> Callable[[Dict[str, Any]], None]:
+        """Return the collection's compiled validator, compiling it on first use."""
+        validators = self.db.validators
+        validator = validators.get(self.name)
+        if validator is None:
+            validator = self.compile_schema(self.db.schemas.get(self.name, {}))
+            validators[self.name] = validator
+        return validator
 
     def insert(self, docs: Any, apply_transaction: bool = False) -> Any:
         """Insert one or more documents into the collection.
@@ -74,12 +235,14 @@ class Collection:
             ValidationError: If a document is not a dictionary or fails schema validation.
             KiteDBError: If the insert operation fails.
         """
-        with self.lock:
+        with self.db.writing():
             documents = docs if isinstance(docs, list) else [docs]
+            # Looked up once rather than per document
+            validate = self._validator()
             for doc in documents:
                 if not isinstance(doc, dict):
                     raise ValidationError("Document must be a dictionary")
-                self.validate_schema(doc)
+                validate(doc)
 
             try:
                 if (
@@ -94,30 +257,30 @@ class Collection:
                             "params": [documents],
                         }
                     )
-                    logger.debug(
-                        f"Logged insert in '{self.name}': {len(documents)} documents"
-                    )
+                    logger.debug("Logged insert in '%s': %d documents", self.name, len(documents))
                     return "logged"
                 else:
+                    documents = list(map(intern_keys, documents))
                     docs_list = self.db.collections[self.name]
                     start_id = len(docs_list)
-                    for i, doc in enumerate(documents):
-                        docs_list.append(doc)
-                        self.db.indexes[self.name].add_bulk(doc, start_id + i)
-                    self.db.save()
-                    logger.info(
-                        f"Inserted {len(documents)} documents into '{self.name}'"
-                    )
+                    docs_list.extend(documents)
+                    self.db.indexes[self.name].add_many(documents, start_id)
+                    # Copies keep the journal entry unaffected by later in-place updates
+                    self.db.journal(("insert", self.name, [dict(doc) for doc in documents]))
+                    logger.info("Inserted %d documents into '%s'", len(documents), self.name)
                     return list(range(start_id, start_id + len(documents)))
             except Exception as e:
-                logger.error(f"Insert failed in '{self.name}': {e}")
+                logger.error("Insert failed in '%s': %s", self.name, e)
                 raise KiteDBError(f"Insert operation failed: {e}")
 
-    def find(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def find(self, query: Dict[str, Any], copy: bool = True) -> List[Dict[str, Any]]:
         """Find documents in the collection matching the given query.
 
         Args:
             query (Dict[str, Any]): The query to filter documents.
+            copy (bool): If False, return the stored documents themselves instead of copies.
+                Only for callers that just read or serialize the results; mutating them
+                corrupts the collection and its indexes.
 
         Returns:
             List[Dict[str, Any]]: List of matching documents.
@@ -125,40 +288,95 @@ class Collection:
         Raises:
             KiteDBError: If the find operation fails.
         """
-        with self.lock:
+        with self.lock.reader:
             try:
-                results = []
-                if not query:
-                    for doc in self.db.collections[self.name]:
-                        results.append(doc.copy())
+                docs = self.db.collections[self.name]
+                plan = plan_query(query)
+                if plan.kind == "empty":
+                    # map() runs dict.copy without a Python-level loop body per document
+                    results = list(map(dict.copy, docs)) if copy else list(docs)
+                    logger.info(
+                        "Find in '%s' with empty query returned %d docs",
+                        self.name, len(results),
+                    )
+                    return results
+                if plan.kind == "indexed_eq":
+                    doc_ids = self.db.indexes[self.name].query(plan.field, plan.value)
+                    if copy:
+                        results = [docs[doc_id].copy() for doc_id in doc_ids]
+                    else:
+                        results = [docs[doc_id] for doc_id in doc_ids]
                     logger.info(
-                        f"Find in '{self.name}' with empty query returned {len(results)} docs"
+                        "Find in '%s' with indexed query %s returned %d docs",
+                        self.name, query, len(results),
                     )
                     return results
-                if len(query) == 1 and not any(k.startswith("$") for k in query.keys()):
-                    field = next(iter(query))
-                    value = query[field]
-                    if isinstance(value, dict) and len(value) == 1 and "$eq" in value:
-                        doc_ids = self.db.indexes[self.name].query(field, value["$eq"])
-                        for doc_id in doc_ids:
-                            results.append(
-                                self.db.collections[self.name][doc_id].copy()
-                            )
+                if plan.kind == "indexed":
+                    match = QueryParser.compile(query)
+                    doc_ids = self.db.indexes[self.name].query_all(plan.pairs)
+                    results = [docs[doc_id] for doc_id in doc_ids if match(docs[doc_id])]
+                    if copy:
+                        results = list(map(dict.copy, results))
+                    logger.info(
+                        "Find in '%s' with indexed query %s returned %d docs",
+                        self.name, query, len(results),
+                    )
+                    return results
+                if plan.kind == "indexed_range":
+                    doc_ids = self.db.indexes[self.name].query_range(plan.field, plan.value)
+                    if doc_ids is not None:
+                        if copy:
+                            results = [docs[doc_id].copy() for doc_id in doc_ids]
+                        else:
+                            results = [docs[doc_id] for doc_id in doc_ids]
                         logger.info(
-                            f"Find in '{self.name}' with indexed query {query} returned {len(results)} docs"
+                            "Find in '%s' with indexed query %s returned %d docs",
+                            self.name, query, len(results),
                         )
                         return results
-                for doc in self.db.collections[self.name]:
-                    if self._match(doc, query):
-                        results.append(doc.copy())
+                # Writers are excluded while the read lock is held, so a cached ID list is current
+                key = _query_key(query)
+                cache = self.db.query_cache.get(self.name)
+                doc_ids = cache.get(key) if cache is not None and key is not None else None
+                if doc_ids is None:
+                    # Compiled once per call, then applied by map() without a Python loop body
+                    doc_ids = list(compress(range(len(docs)), map(QueryParser.compile(query), docs)))
+                    if key is not None:
+                        self._cache_ids(key, doc_ids)
+                    cached = ""
+                else:
+                    try:
+                        cache.move_to_end(key)
+                    except KeyError:
+                        # Evicted by a concurrent find since the lookup
+                        pass
+                    cached = " (cached)"
+                if copy:
+                    results = [docs[doc_id].copy() for doc_id in doc_ids]
+                else:
+                    results = [docs[doc_id] for doc_id in doc_ids]
                 logger.info(
-                    f"Find in '{self.name}' with query {query} returned {len(results)} docs"
+                    "Find in '%s' with query %s returned %d docs%s",
+                    self.name, query, len(results), cached,
                 )
                 return results
             except Exception as e:
-                logger.error(f"Find failed in '{self.name}': {e}")
+                logger.error("Find failed in '%s': %s", self.name, e)
                 raise KiteDBError(f"Find operation failed: {e}")
 
+    def _cache_ids(self, key: str, doc_ids: List[int]) -> None:
+        """Remember the IDs a scanning find matched, evicting the least recently used entry when full."""
+        cache = self.db.query_cache.get(self.name)
+        if cache is None:
+            # setdefault keeps the first cache if two readers race to create one
+            cache = self.db.query_cache.setdefault(self.name, OrderedDict())
+        cache[key] = doc_ids
+        if len(cache) > _QUERY_CACHE_SIZE:
+            try:
+                cache.popitem(last=False)
+            except KeyError:
+                pass
+
     def update(
         self, query: Dict[str, Any], updates: Any, apply_transaction: bool = False
     ) -> Any:
@@ -176,12 +394,13 @@ class Collection:
             ValidationError: If an update is not a dictionary or fails schema validation.
             KiteDBError: If the update operation fails.
         """
-        with self.lock:
+        with self.db.writing():
             update_list = updates if isinstance(updates, list) else [updates]
+            validate = self._validator()
             for update in update_list:
                 if not isinstance(update, dict):
                     raise ValidationError("Update must be a dictionary")
-                self.validate_schema(update)
+                validate(update)
 
             try:
                 if (
@@ -197,27 +416,55 @@ class Collection:
                         }
                     )
                     logger.debug(
-                        f"Logged update in '{self.name}': query={query}, updates={len(update_list)}"
+                        "Logged update in '%s': query=%s, updates=%d",
+                        self.name, query, len(update_list),
                     )
                     return "logged"
                 else:
                     count = 0
+                    changed = []
                     docs = self.db.collections[self.name]
-                    for idx, doc in enumerate(docs):
-                        if self._match(doc, query):
-                            old = doc.copy()
-                            for update in update_list:
-                                doc.update(update)
-                            self.db.indexes[self.name].reindex(old, doc, idx)
-                            count += 1
+                    index = self.db.indexes[self.name]
+                    plan = plan_query(query)
+                    targets = index.query_range(plan.field, plan.value) if plan.kind == "indexed_range" else None
+                    if plan.kind == "indexed_eq":
+                        # The index already picks out exactly the matches, as a sorted copy
+                        # that reindex() below can't disturb
+                        targets = index.query(plan.field, plan.value)
+                    elif plan.kind == "indexed":
+                        match = QueryParser.compile(query)
+                        targets = [idx for idx in index.query_all(plan.pairs) if match(docs[idx])]
+                    elif targets is None:
+                        match = QueryParser.compile(query)
+                        targets = list(compress(range(len(docs)), map(match, docs)))
+                    # Later updates win either way, so applying them pre-merged is equivalent
+                    merged = {}
+                    for update in update_list:
+                        merged.update(update)
+                    merged = intern_keys(merged)
+                    # Only fields whose value actually changes touch the index, all in one batch
+                    removes = []
+                    adds = []
+                    for idx in targets:
+                        doc = docs[idx]
+                        for k, v in merged.items():
+                            if k in doc:
+                                old = doc[k]
+                                if old == v:
+                                    continue
+                                removes.append((k, old, idx))
+                            adds.append((k, v, idx))
+                        doc.update(merged)
+                        changed.append((idx, dict(doc)))
+                        count += 1
+                    if adds:
+                        index.apply_batch(adds, removes)
                     if count:
-                        self.db.save()
-                    logger.info(
-                        f"Updated {count} docs in '{self.name}' with query {query}"
-                    )
+                        self.db.journal(("update", self.name, changed))
+                    logger.info("Updated %s docs in '%s' with query %s", count, self.name, query)
                     return count
             except Exception as e:
-                logger.error(f"Update failed in '{self.name}': {e}")
+                logger.error("Update failed in '%s': %s", self.name, e)
                 raise KiteDBError(f"Update operation failed: {e}")
 
     def delete(self, query: Dict[str, Any], apply_transaction: bool = False) -> Any:
@@ -233,7 +480,7 @@ class Collection:
         Raises:
             KiteDBError: If the delete operation fails.
         """
-        with self.lock:
+        with self.db.writing():
             try:
                 if (
                     self.db.transaction
@@ -243,37 +490,36 @@ class Collection:
                     self.db.transaction.log(
                         {"collection": self.name, "action": "delete", "params": [query]}
                     )
-                    logger.debug(f"Logged delete in '{self.name}': query={query}")
+                    logger.debug("Logged delete in '%s': query=%s", self.name, query)
                     return "logged"
                 else:
-                    count = 0
-                    new_docs = []
                     docs = self.db.collections[self.name]
-                    for idx, doc in enumerate(docs):
-                        if self._match(doc, query):
-                            self.db.indexes[self.name].remove_bulk(doc, idx)
-                            count += 1
-                        else:
-                            new_docs.append(doc)
+                    index = self.db.indexes[self.name]
+                    plan = plan_query(query)
+                    removed = index.query_range(plan.field, plan.value) if plan.kind == "indexed_range" else None
+                    if plan.kind == "indexed_eq":
+                        removed = index.query(plan.field, plan.value)
+                    elif plan.kind == "indexed":
+                        match = QueryParser.compile(query)
+                        removed = [idx for idx in index.query_all(plan.pairs) if match(docs[idx])]
+                    elif removed is None:
+                        removed = list(compress(range(len(docs)), map(QueryParser.compile(query), docs)))
+                    count = len(removed)
                     if count:
-                        self.db.collections[self.name] = new_docs
-                        self.db.save()
-                    logger.info(
-                        f"Deleted {count} docs from '{self.name}' with query {query}"
-                    )
+                        if count <= _DELETE_IN_PLACE:
+                            # From the end, so each removal leaves the earlier positions where they were
+                            for idx in reversed(removed):
+                                del docs[idx]
+                        else:
+                            removed_set = set(removed)
+                            self.db.collections[self.name] = [
+                                doc for idx, doc in enumerate(docs) if idx not in removed_set
+                            ]
+                        # Survivors shift down, so the index is renumbered rather than just pruned
+                        index.compact(removed)
+                        self.db.journal(("delete", self.name, removed))
+                    logger.info("Deleted %s docs from '%s' with query %s", count, self.name, query)
                     return count
             except Exception as e:
-                logger.error(f"Delete failed in '{self.name}': {e}")
+                logger.error("Delete failed in '%s': %s", self.name, e)
                 raise KiteDBError(f"Delete operation failed: {e}")
-
-    def _match(self, doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
-        """Check if a document matches the given query.
-
-        Args:
-            doc (Dict[str, Any]): The document to check.
-            query (Dict[str, Any]): The query to match against.
-
-        Returns:
-            bool: True if the document matches the query, False otherwise.
-        """
-        return QueryParser.match(doc, query)
\ No newline at end of file
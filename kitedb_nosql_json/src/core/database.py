@@ -1,12 +1,20 @@
 from src.storage.storage_engine import StorageEngine
 from src.index.index_manager import IndexManager
-from src.core.collection import Collection
+from src.core.collection import Collection, intern_keys
 from src.core.transaction import Transaction
 from src.config import logger
 from src.core.exceptions import KiteDBError
-from threading import Lock
+from src.core.rwlock import RWLock
+from threading import Lock, local
+from contextlib import contextmanager, nullcontext
 import re
 
+# Number of DDL lock stripes; a power of two so a name's stripe is a mask of its hash
+_STRIPES = 16
+
+# Whole-string match, so a trailing newline can't slip past as it does with "$"
+_NAME_RE = re.compile(r"[a-zA-Z0-9_-]+")
+
 
 class Database:
     def __init__(self, name: str):
@@ -15,79 +23,194 @@ class Database:
         self.collections = {}
         self.schemas = {}
         self.indexes = {}
-        self.transaction = None
-        self._lock = Lock()
+        self.validators = {}
+        # Per collection, the doc IDs matched by recent scanning finds; emptied on any change
+        self.query_cache = {}
+        # One Collection handle per name, handed out by get_collection
+        self._coll_cache = {}
+        # Transactions belong to the thread (client session) that began them, so one
+        # Database can be shared by many server connections
+        self._local = local()
+        # DDL on one name is serialized by that name's stripe, so work on unrelated
+        # collections doesn't queue behind a database-wide mutex
+        self._stripes = tuple(Lock() for _ in range(_STRIPES))
+        # Guards collection data and saves: finds share the read side, changes and saves take the write side
+        self.data_lock = RWLock()
+        # Nesting depth of batch_saves() and whether a save was requested inside it
+        self._save_depth = 0
+        self._save_pending = False
+        # Journal entries held back until the enclosing batch_saves() block ends
+        self._pending_ops = []
         self._load()
 
+    @property
+    def transaction(self):
+        """The calling thread's transaction, or None if it hasn't begun one."""
+        return getattr(self._local, "transaction", None)
+
+    @transaction.setter
+    def transaction(self, value):
+        self._local.transaction = value
+
     def _load(self):
         """Loads database data from storage and initializes collections and indexes"""
         try:
             data = self.storage.load()
             self.collections = data.get("collections", {})
             self.schemas = data.get("schemas", {})
+            # Building is pure-Python CPU work, so threads would only contend for the GIL;
+            # one bulk pass per collection is the cheapest way through
             for coll, docs in self.collections.items():
+                docs[:] = map(intern_keys, docs)
                 idx = IndexManager()
-                for i, doc in enumerate(docs):
-                    idx.build(doc, i)
+                idx.bulk_build(docs)
                 self.indexes[coll] = idx
-            logger.info(f"Database '{self.name}' loaded from '{self.storage.db_path}'")
+            logger.info("Database '%s' loaded from '%s'", self.name, self.storage.db_path)
         except Exception as e:
-            logger.error(f"Load database '{self.name}' failed: {e}")
+            logger.error("Load database '%s' failed: %s", self.name, e)
             raise KiteDBError(f"Failed to load database: {e}")
 
+    def flush(self):
+        """Fold the journal into a snapshot, so the next open has nothing to replay."""
+        with self.data_lock.writer:
+            if self.storage.journal_records:
+                self.save()
+
     def save(self):
         """Saves the current state of collections and schemas to storage."""
+        if self._save_depth:
+            self._save_pending = True
+            return
         try:
             self.storage.save(
                 {"collections": self.collections, "schemas": self.schemas}
             )
-            logger.info(f"Database '{self.name}' saved")
+            logger.info("Database '%s' saved", self.name)
+        except Exception as e:
+            logger.error("Save database '%s' failed: %s", self.name, e)
+            raise KiteDBError(f"Failed to save database: {e}")
+
+    @contextmanager
+    def writing(self):
+        """Hold the data write lock for a change, then wait for its journal record once the lock is released."""
+        with self.data_lock.writer:
+            yield
+        # Waiting outside the lock lets other writers queue records for the same sync; a block
+        # nested in another write leaves the wait to the outermost one
+        if not self.data_lock.is_writer():
+            try:
+                self.storage.sync()
+            except Exception as e:
+                logger.error("Save database '%s' failed: %s", self.name, e)
+                raise KiteDBError(f"Failed to save database: {e}")
+
+    @contextmanager
+    def batch_saves(self):
+        """Hold the data write lock and write storage once for every save requested inside the block."""
+        with self.writing():
+            self._save_depth += 1
+            try:
+                yield
+            finally:
+                self._save_depth -= 1
+                if not self._save_depth:
+                    ops, self._pending_ops = self._pending_ops, []
+                    if self._save_pending:
+                        # A full snapshot already covers the held-back changes
+                        self._save_pending = False
+                        self.save()
+                    elif ops:
+                        self._write_journal(ops)
+
+    def journal(self, op: tuple):
+        """Record a document change without rewriting the whole database."""
+        with self.data_lock.writer:
+            # Whether it ends up journaled or folded into a snapshot, the collection's chunk is now behind
+            self.storage.mark_dirty(op[1])
+            self.query_cache.pop(op[1], None)
+            if self._save_depth:
+                self._pending_ops.append(op)
+                return
+            self._write_journal([op])
+
+    def _write_journal(self, ops: list):
+        """Append ops to the storage journal as one record, compacting into a snapshot when it grows long."""
+        try:
+            records = self.storage.append_ops(ops)
         except Exception as e:
-            logger.error(f"Save database '{self.name}' failed: {e}")
+            logger.error("Save database '%s' failed: %s", self.name, e)
             raise KiteDBError(f"Failed to save database: {e}")
+        if records >= self.storage.compact_every:
+            self.save()
+
+    def _lock_for(self, name: str) -> Lock:
+        """Return the stripe lock guarding DDL on a collection name."""
+        return self._stripes[hash(name) & (_STRIPES - 1)]
 
     def create_collection(self, name: str, schema: dict = None):
         """Creates a new collection with an optional schema, validating the name."""
-        if not re.match(r"^[a-zA-Z0-9_-]+$", name):
+        if not _NAME_RE.fullmatch(name):
             raise KiteDBError(
                 "Collection name must contain only letters, numbers, underscores, or hyphens"
             )
-        if name in self.collections:
-            raise KiteDBError(f"Collection '{name}' already exists")
-        self.collections[name] = []
-        self.indexes[name] = IndexManager()
-        if schema:
-            self.schemas[name] = schema
-        self.save()
-        logger.info(f"Collection '{name}' created in '{self.name}'")
-
-    def drop_collection(self, name: str):
-        """Drops a specified collection, logging the action if a transaction is active."""
-        if name not in self.collections:
-            raise KiteDBError(f"Collection '{name}' not found")
-        with self._lock:
-            if self.transaction and self.transaction.active:
+        validator = Collection.compile_schema(schema)
+        with self._lock_for(name), self.data_lock.writer:
+            # Checked under the lock so two creates of one name can't both pass and the second wipe the first
+            if name in self.collections:
+                raise KiteDBError(f"Collection '{name}' already exists")
+            self.collections[name] = []
+            self.indexes[name] = IndexManager()
+            self.validators[name] = validator
+            if schema:
+                self.schemas[name] = schema
+            self.storage.mark_dirty(name)
+            self.save()
+        logger.info("Collection '%s' created in '%s'", name, self.name)
+
+    def drop_collection(self, name: str, apply_transaction: bool = False):
+        """Drops a specified collection, logging the action if a transaction is active.
+
+        apply_transaction drops it immediately, as Transaction.commit does when replaying the log.
+        """
+        # A replaying commit already holds the data write lock; taking the stripe after it
+        # would invert the stripe-then-data order every other caller uses
+        with nullcontext() if apply_transaction else self._lock_for(name):
+            if name not in self.collections:
+                raise KiteDBError(f"Collection '{name}' not found")
+            if self.transaction and self.transaction.active and not apply_transaction:
                 self.transaction.log(
                     {"collection": name, "action": "drop", "params": []}
                 )
-                logger.debug(f"Logged drop collection '{name}'")
+                logger.debug("Logged drop collection '%s'", name)
                 return "logged"
-            self.collections.pop(name, None)
-            self.indexes.pop(name, None)
-            self.schemas.pop(name, None)
-            self.save()
-            logger.info(f"Collection '{name}' dropped from '{self.name}'")
+            with self.data_lock.writer:
+                # A replaying commit may have dropped it while we waited for the lock
+                if name not in self.collections:
+                    raise KiteDBError(f"Collection '{name}' not found")
+                self.collections.pop(name, None)
+                self.indexes.pop(name, None)
+                self.validators.pop(name, None)
+                self.schemas.pop(name, None)
+                self._coll_cache.pop(name, None)
+                self.query_cache.pop(name, None)
+                self.storage.mark_dirty(name)
+                self.save()
+            logger.info("Collection '%s' dropped from '%s'", name, self.name)
 
     def get_collection(self, name: str) -> Collection:
         """Retrieves a collection object by name for further operations."""
         if name not in self.collections:
             raise KiteDBError(f"Collection '{name}' not found")
-        return Collection(self, name)
+        coll = self._coll_cache.get(name)
+        if coll is None:
+            # setdefault keeps the first handle if two threads race to create one
+            coll = self._coll_cache.setdefault(name, Collection(self, name))
+        return coll
 
     def begin_transaction(self):
         """Initiates a new transaction, ensuring no existing transaction is active."""
-        with self._lock:
-            if self.transaction and self.transaction.active:
-                raise KiteDBError("Transaction already active")
-            self.transaction = Transaction(self)
-            self.transaction.begin()
\ No newline at end of file
+        # The slot is per thread, so there is nothing shared to lock here
+        if self.transaction and self.transaction.active:
+            raise KiteDBError("Transaction already active")
+        self.transaction = Transaction(self)
+        self.transaction.begin()
\ No newline at end of file
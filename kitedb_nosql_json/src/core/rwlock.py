@@ -0,0 +1,85 @@
+from threading import Condition, Lock, get_ident
+
+
+class RWLock:
+    """Reader-writer lock: many concurrent readers or one writer, with waiting writers served first.
+
+    The write side is reentrant, and the writing thread may also take the read side.
+    Read acquisitions must not nest, since a writer queued in between would deadlock them.
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self.reader = _Side(self.acquire_read, self.release_read)
+        self.writer = _Side(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        """Block until no writer holds or is waiting for the lock, then enter as a reader."""
+        with self._cond:
+            if self._writer == get_ident():
+                self._write_depth += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """Leave as a reader, waking writers when the last reader is done."""
+        with self._cond:
+            if self._writer == get_ident():
+                self._release_write_locked()
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Block until there are no readers and no other writer, then enter as the writer."""
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """Leave as the writer, waking everyone waiting once the outermost hold is released."""
+        with self._cond:
+            self._release_write_locked()
+
+    def is_writer(self) -> bool:
+        """Return True if the calling thread holds the write side."""
+        return self._writer == get_ident()
+
+    def _release_write_locked(self):
+        self._write_depth -= 1
+        if not self._write_depth:
+            self._writer = None
+            self._cond.notify_all()
+
+
+class _Side:
+    """Context manager for one side of an RWLock."""
+
+    __slots__ = ("_acquire", "_release")
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._release()
@@ -1,15 +1,24 @@
-from threading import Lock
-from typing import List, Dict
+from threading import RLock
+from typing import Any, List, Dict, NamedTuple
 from src.config import logger
 from src.core.exceptions import TransactionError
 
 
+class LoggedOp(NamedTuple):
+    """One operation held back until commit; a tuple is a fraction of the size of the dict it comes from."""
+
+    collection: str
+    action: str
+    params: List[Any]
+
+
 class Transaction:
     def __init__(self, db: "Database"):
         self.db = db
-        self.lock = Lock()
+        # Reentrant so a failed commit can roll back while still holding it
+        self.lock = RLock()
         self.active = False
-        self.ops: List[Dict] = []
+        self.ops: List[LoggedOp] = []
 
     def begin(self):
         """Initiates a new transaction, ensuring no existing transaction is active"""
@@ -25,8 +34,8 @@ class Transaction:
         with self.lock:
             if not self.active:
                 raise TransactionError("No active transaction")
-            self.ops.append(op)
-            logger.debug(f"Logged operation: {op}")
+            self.ops.append(LoggedOp(op["collection"], op["action"], op["params"]))
+            logger.debug("Logged operation: %s", op)
 
     def commit(self) -> None:
         """Commits all logged operations to the database and clears the transaction"""
@@ -34,26 +43,42 @@ class Transaction:
             if not self.active:
                 raise TransactionError("No active transaction")
             try:
-                for op in self.ops:
-                    coll_name = op["collection"]
-                    action = op["action"]
-                    params = op["params"]
-                    if action == "add":
-                        coll = self.db.get_collection(coll_name)
-                        coll.insert(params[0], apply_transaction=True)
-                    elif action == "update":
-                        coll = self.db.get_collection(coll_name)
-                        coll.update(params[0], params[1], apply_transaction=True)
-                    elif action == "delete":
-                        coll = self.db.get_collection(coll_name)
-                        coll.delete(params[0], apply_transaction=True)
-                    elif action == "drop":
-                        self.db.drop_collection(coll_name)
+                # One storage write for the whole commit instead of one per operation
+                with self.db.batch_saves():
+                    ops = self.ops
+                    # Reused while consecutive ops target the same collection
+                    coll = None
+                    i = 0
+                    while i < len(ops):
+                        coll_name, action, params = ops[i]
+                        i += 1
+                        if action == "drop":
+                            self.db.drop_collection(coll_name, apply_transaction=True)
+                            coll = None
+                            continue
+                        if coll is None or coll.name != coll_name:
+                            coll = self.db.get_collection(coll_name)
+                        if action == "add":
+                            # A run of inserts into one collection goes in as a single insert, so the
+                            # index is extended and the change journaled once for the whole run
+                            documents = list(params[0])
+                            while (
+                                i < len(ops)
+                                and ops[i].action == "add"
+                                and ops[i].collection == coll_name
+                            ):
+                                documents.extend(ops[i].params[0])
+                                i += 1
+                            coll.insert(documents, apply_transaction=True)
+                        elif action == "update":
+                            coll.update(params[0], params[1], apply_transaction=True)
+                        elif action == "delete":
+                            coll.delete(params[0], apply_transaction=True)
                 self.active = False
                 self.ops.clear()
                 logger.info("Transaction committed")
             except Exception as e:
-                logger.error(f"Commit failed: {e}")
+                logger.error("Commit failed: %s", e)
                 self.rollback()
                 raise TransactionError(f"Commit failed: {e}")
 
@@ -0,0 +1,54 @@
+# Command reference shared by the console and the server
+HELP_MESSAGE = """
+KiteDB v2.0 Help
+================
+
+KiteDB is a NoSQL JSON database supporting collections, transactions, and complex queries.
+
+General Commands
+---------------
+- login <username>                  Authenticate user (e.g., 'login admin').
+- use <database_name>               Switch to a database (e.g., 'use mydb'). Creates if it doesn't exist.
+- exitdb                            Exit the current database context without exiting the program.
+- list                              List all databases in the storage root.
+- create <collection_name> [schema] Create a collection with an optional JSON schema.
+- delete <collection_name>          Delete a collection (e.g., 'delete users').
+- begin                             Start a transaction for atomic operations.
+- commit                            Commit the current transaction.
+- rollback                          Roll back the current transaction.
+- exit                              Exit the KiteDB console.
+- help                              Display this help message.
+- adduser <username> <password>     Add a new user.
+- removeuser <username>             Remove an existing user.
+- setperm <username> <db_name> <coll_name> <perm1> [perm2 ...]  
+  - Set permissions for a user on a database or collection.
+  - Permissions: read, write, update, delete, create, access
+  - Use 'access denied' to deny all access to a database (e.g., 'setperm ali testdb * access denied').
+  - Use 'access allowed' to grant access to a database (e.g., 'setperm ali testdb * access allowed read write update').
+  - Example: setperm ali testdb users read write update
+- listperms [username]              List permissions for a user or all users.
+
+Collection Operations
+--------------------
+Format: <collection>.<operation>{<parameters>}
+Parameters must be valid JSON objects or arrays, enclosed in curly braces {}.
+
+1. add{<document> | [<document>, ...]}
+   - Add one or more documents to a collection.
+   - Example: users.add{{"name": "Alice", "age": 25}}
+2. find{<query>}
+   - Find documents matching the query.
+   - Example: users.find{"name": "Alice"}
+3. update{<query>,<update>}
+   - Update documents matching the query.
+   - Example: users.update{"name": "Alice", "age": 26}
+4. delete{<query>}
+   - Delete documents matching the query.
+   - Example: users.delete{"name": "Alice"}
+
+Supported Query Operators
+------------------------
+- Comparison: $eq, $ne, $gt, $gte, $lt, $lte
+- Logical: $and, $or, $not
+- Dot notation for nested fields: e.g., "address.city": "San Francisco"
+"""
@@ -1,79 +1,225 @@
-from typing import Dict, Any, List
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 from src.config import logger
 
+# Entry count past which a warning suggests persistent indexing
+_SIZE_WARNING = 100000
 
-class BTreeNode:
-    def __init__(self):
-        """Initialize a BTreeNode with empty lists for keys, values, and children."""
-        self.keys = []
-        self.values = []
-        self.children = []
+
+# Stands in for a field whose sorted keys haven't been computed since it last changed
+_UNSORTED = object()
+
+
+def _is_number(value: Any) -> bool:
+    """Return True for values that order against any other number without raising; NaN never does."""
+    return isinstance(value, (int, float)) and value == value
+
+
+def _freeze(value: Any) -> Any:
+    """Return a hashable stand-in for a list or dict that compares equal exactly when the originals do."""
+    if isinstance(value, list):
+        return tuple(_index_key(v) for v in value)
+    return frozenset((k, _index_key(v)) for k, v in value.items())
+
+
+def _index_key(value: Any) -> Any:
+    """Map a field value to its key in a field's hash index."""
+    # JSON values are hashable apart from arrays and objects
+    if isinstance(value, (list, dict)):
+        return _freeze(value)
+    return value
 
 
 class IndexManager:
     def __init__(self):
         """Initialize the IndexManager with an empty index dictionary and size counter."""
-        self.index: Dict[str, BTreeNode] = {}  # Dictionary to store field-to-node mappings
+        # field -> value key -> IDs of the documents holding that value
+        self.index: Dict[str, Dict[Any, Set[int]]] = {}
         self._size = 0  # Counter for total number of index entries
+        # field -> its value keys in ascending order, or None if not all of them are numbers;
+        # dropped whenever the field gains or loses a key
+        self._sorted: Dict[str, Any] = {}
 
     def build(self, doc: Dict[str, Any], doc_id: int):
         """Build an index for all fields in a document by adding each field-value pair."""
-        # Iterate through each key-value pair in the document and add to the index
-        for k, v in doc.items():
-            self.add(k, v, doc_id)
+        self.add_many((doc,), doc_id)
 
     def add(self, field: str, value: Any, doc_id: int):
         """Add a field-value pair with a document ID to the index."""
-        # Create a new BTreeNode for the field if it doesn't exist
-        if field not in self.index:
-            self.index[field] = BTreeNode()
-        node = self.index[field]
-        # Add the value and doc_id if the value is not already in the node's keys
-        if value not in node.keys:
-            node.keys.append(value)
-            node.values.append([doc_id])
+        self._add(field, value, doc_id)
+        logger.debug("Index add: %s=%s @ %s", field, value, doc_id)
+
+    def _add(self, field: str, value: Any, doc_id: int):
+        values = self.index.get(field)
+        if values is None:
+            values = self.index[field] = {}
+        key = _index_key(value)
+        ids = values.get(key)
+        if ids is None:
+            ids = values[key] = set()
+            self._sorted.pop(field, None)
+        if doc_id not in ids:
+            ids.add(doc_id)
             self._size += 1
-        else:
-            # If value exists, append doc_id to the existing value's list if not already present
-            idx = node.keys.index(value)
-            if doc_id not in node.values[idx]:
-                node.values[idx].append(doc_id)
-                self._size += 1
-        # Warn if index size exceeds threshold to suggest persistent indexing
-        if self._size > 100000:
-            logger.warning(
-                f"Index size for field '{field}' exceeds 100,000 entries; consider persistent indexing"
-            )
-        logger.debug(f"Index add: {field}={value} @ {doc_id}")
+            # Warn once on crossing the threshold rather than on every add past it
+            if self._size == _SIZE_WARNING + 1:
+                logger.warning(
+                    "Index size for field '%s' exceeds 100,000 entries; consider persistent indexing", field
+                )
 
     def add_bulk(self, doc: Dict[str, Any], doc_id: int):
         """Add all field-value pairs of a document to the index in bulk."""
         # Delegate to build method to process all fields in the document
         self.build(doc, doc_id)
 
+    def add_many(self, docs: List[Dict[str, Any]], start_id: int):
+        """Index a run of documents whose IDs are consecutive from start_id."""
+        # The body of _add inlined, with locals in place of attribute lookups and the level
+        # checked once for the whole batch
+        index = self.index
+        size = before = self._size
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for doc_id, doc in enumerate(docs, start_id):
+            for k, v in doc.items():
+                values = index.get(k)
+                if values is None:
+                    values = index[k] = {}
+                key = _index_key(v)
+                ids = values.get(key)
+                if ids is None:
+                    values[key] = {doc_id}
+                    size += 1
+                    self._sorted.pop(k, None)
+                elif doc_id not in ids:
+                    ids.add(doc_id)
+                    size += 1
+                if debug:
+                    logger.debug("Index add: %s=%s @ %s", k, v, doc_id)
+        self._size = size
+        if before <= _SIZE_WARNING < size:
+            logger.warning("Index size exceeds 100,000 entries; consider persistent indexing")
+
+    def bulk_build(self, docs: List[Dict[str, Any]]):
+        """Index a freshly loaded collection, whose document IDs are its list positions.
+
+        Fills the field maps directly instead of going through add(), so there is no
+        per-entry duplicate check, size bookkeeping or debug logging.
+        """
+        index = self.index
+        for doc_id, doc in enumerate(docs):
+            for k, v in doc.items():
+                values = index.get(k)
+                if values is None:
+                    values = index[k] = {}
+                key = _index_key(v)
+                ids = values.get(key)
+                if ids is None:
+                    values[key] = {doc_id}
+                else:
+                    ids.add(doc_id)
+        self._sorted.clear()
+        self._size = sum(len(ids) for values in index.values() for ids in values.values())
+        if self._size > _SIZE_WARNING:
+            logger.warning("Index size exceeds 100,000 entries; consider persistent indexing")
+        logger.debug("Index built: %d documents, %d entries", len(docs), self._size)
+
     def remove_bulk(self, doc: Dict[str, Any], doc_id: int):
         """Remove all field-value pairs of a document from the index."""
-        # Iterate through each key-value pair in the document and remove from the index
+        remove = self._remove
+        debug = logger.isEnabledFor(logging.DEBUG)
         for k, v in doc.items():
-            self.remove(k, v, doc_id)
+            remove(k, v, doc_id)
+            if debug:
+                logger.debug("Index remove: %s=%s @ %s", k, v, doc_id)
 
     def remove(self, field: str, value: Any, doc_id: int):
         """Remove a specific field-value pair with a document ID from the index."""
-        # Get the node for the specified field, if it exists
-        node = self.index.get(field)
-        if node and value in node.keys:
-            # Find the index of the value in the node's keys
-            idx = node.keys.index(value)
-            # Remove the doc_id from the value's list if present
-            if doc_id in node.values[idx]:
-                node.values[idx].remove(doc_id)
+        self._remove(field, value, doc_id)
+        logger.debug("Index remove: %s=%s @ %s", field, value, doc_id)
+
+    def _remove(self, field: str, value: Any, doc_id: int):
+        values = self.index.get(field)
+        if values is not None:
+            key = _index_key(value)
+            ids = values.get(key)
+            if ids is not None and doc_id in ids:
+                ids.discard(doc_id)
                 self._size -= 1
-                # If the value's list is empty, remove the key and value from the node
-                if not node.values[idx]:
-                    node.keys.pop(idx)
-                    node.values.pop(idx)
-                    self._size -= 1
-        logger.debug(f"Index remove: {field}={value} @ {doc_id}")
+                # Drop values no document holds any more
+                if not ids:
+                    del values[key]
+                    self._sorted.pop(field, None)
+
+    def apply_batch(
+        self,
+        adds: Iterable[Tuple[str, Any, int]],
+        removes: Iterable[Tuple[str, Any, int]] = (),
+    ):
+        """Apply many (field, value, doc_id) changes at once, removals first.
+
+        Entries are grouped by field and value so each affected ID set is updated once per batch.
+        """
+        grouped_removes = defaultdict(list)
+        for field, value, doc_id in removes:
+            grouped_removes[field, _index_key(value)].append(doc_id)
+        grouped_adds = defaultdict(list)
+        for field, value, doc_id in adds:
+            grouped_adds[field, _index_key(value)].append(doc_id)
+
+        index = self.index
+        size = self._size
+        for (field, key), doc_ids in grouped_removes.items():
+            values = index.get(field)
+            ids = values.get(key) if values is not None else None
+            if ids is not None:
+                before = len(ids)
+                ids.difference_update(doc_ids)
+                size -= before - len(ids)
+                # Drop values no document holds any more
+                if not ids:
+                    del values[key]
+                    self._sorted.pop(field, None)
+        for (field, key), doc_ids in grouped_adds.items():
+            values = index.get(field)
+            if values is None:
+                values = index[field] = {}
+            ids = values.get(key)
+            if ids is None:
+                ids = values[key] = set()
+                self._sorted.pop(field, None)
+            before = len(ids)
+            ids.update(doc_ids)
+            size += len(ids) - before
+        if self._size <= _SIZE_WARNING < size:
+            logger.warning("Index size exceeds 100,000 entries; consider persistent indexing")
+        self._size = size
+        logger.debug(
+            "Index batch: %d values removed from, %d added to", len(grouped_removes), len(grouped_adds)
+        )
+
+    def compact(self, removed: List[int]):
+        """Drop the sorted doc IDs in removed and renumber later IDs to match the shortened list."""
+        if not removed:
+            return
+        removed_set = set(removed)
+        first = removed[0]
+        size = 0
+        for field, values in self.index.items():
+            kept = {}
+            for key, ids in values.items():
+                # IDs before the first removed one keep their numbers, so sets holding only
+                # those are kept as they are
+                if ids and max(ids) >= first:
+                    # Each surviving ID moves down by the number of removed IDs before it
+                    ids = {i - bisect_left(removed, i) for i in ids if i not in removed_set}
+                if ids:
+                    kept[key] = ids
+                    size += len(ids)
+            self.index[field] = kept
+        self._sorted.clear()
+        self._size = size
 
     def reindex(self, old: Dict[str, Any], new: Dict[str, Any], doc_id: int):
         """Reindex a document by removing old field-value pairs and adding new ones."""
@@ -81,12 +227,56 @@ class IndexManager:
         self.remove_bulk(old, doc_id)
         self.add_bulk(new, doc_id)
 
+    def query_all(self, pairs: Iterable[Tuple[str, Any]]) -> List[int]:
+        """Return, in document order, the IDs of documents holding every (field, value) in pairs."""
+        sets = []
+        for field, value in pairs:
+            values = self.index.get(field)
+            ids = values.get(_index_key(value)) if values is not None else None
+            if not ids:
+                return []
+            sets.append(ids)
+        if not sets:
+            return []
+        # Smallest first, so the intersection never grows past the most selective match
+        sets.sort(key=len)
+        return sorted(sets[0].intersection(*sets[1:]))
+
+    def query_range(self, field: str, cond: Dict[str, Any]) -> Optional[List[int]]:
+        """Return, in document order, the IDs of documents whose field satisfies every bound in cond.
+
+        cond maps $gt, $gte, $lt and $lte to numbers. Returns None when the index can't answer
+        exactly because a bound or one of the field's values isn't a number, since comparing
+        those can raise; the caller then scans.
+        """
+        if not all(_is_number(bound) for bound in cond.values()):
+            return None
+        keys = self._sorted.get(field, _UNSORTED)
+        if keys is _UNSORTED:
+            values = self.index.get(field, {})
+            keys = sorted(values) if all(_is_number(key) for key in values) else None
+            self._sorted[field] = keys
+        if keys is None:
+            return None
+        lo, hi = 0, len(keys)
+        for op, bound in cond.items():
+            if op == "$gt":
+                lo = max(lo, bisect_right(keys, bound))
+            elif op == "$gte":
+                lo = max(lo, bisect_left(keys, bound))
+            elif op == "$lt":
+                hi = min(hi, bisect_left(keys, bound))
+            else:
+                hi = min(hi, bisect_right(keys, bound))
+        if lo >= hi:
+            return []
+        values = self.index[field]
+        return sorted(set().union(*(values[key] for key in keys[lo:hi])))
+
     def query(self, field: str, value: Any) -> List[int]:
-        """Query the index for document IDs associated with a field-value pair."""
-        # Get the node for the specified field
-        node = self.index.get(field)
-        # Return the list of document IDs if the value exists in the node's keys
-        if node and value in node.keys:
-            return node.values[node.keys.index(value)]
-        # Return empty list if field or value not found
-        return []
\ No newline at end of file
+        """Query the index for document IDs associated with a field-value pair, in document order."""
+        values = self.index.get(field)
+        if values is None:
+            return []
+        # A fresh list, so callers may edit the index while walking the result
+        return sorted(values.get(_index_key(value), ()))
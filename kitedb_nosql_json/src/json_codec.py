@@ -0,0 +1,72 @@
+import json
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+# Reused by the stdlib fallback; documents come from the database, so they cannot be circular.
+# Text output escapes non-ASCII as json.dumps does by default, so it prints on any console
+# encoding; byte output is UTF-8 and keeps it as is.
+_pretty_encoder = json.JSONEncoder(indent=2, check_circular=False)
+_pretty_utf8_encoder = json.JSONEncoder(indent=2, ensure_ascii=False, check_circular=False)
+
+
+def loads(data: Any) -> Any:
+    """Decode a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode an object as compact UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder still handles
+            pass
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Encode an object as ASCII-only JSON indented by two spaces."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+        else:
+            # orjson can't escape non-ASCII, so only all-ASCII output is used as it is
+            if encoded.isascii():
+                return encoded.decode("ascii")
+    return _pretty_encoder.encode(obj)
+
+
+def dumps_pretty_bytes(obj: Any) -> bytes:
+    """Encode an object as UTF-8 JSON indented by two spaces."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    return _pretty_utf8_encoder.encode(obj).encode("utf-8")
+
+
+def iter_pretty(obj: Any) -> Iterator[str]:
+    """Yield the ASCII-only, two-space indented JSON encoding of an object in chunks."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+        else:
+            if encoded.isascii():
+                yield encoded.decode("ascii")
+                return
+    yield from _pretty_encoder.iterencode(obj)
@@ -1,6 +1,36 @@
+import atexit
 import logging
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """FileHandler that skips the flush after each record, leaving it to whoever drives it."""
+
+    _in_emit = False
+
+    def emit(self, record):
+        self._in_emit = True
+        try:
+            super().emit(record)
+        finally:
+            self._in_emit = False
+
+    def flush(self):
+        if not self._in_emit:
+            super().flush()
+
+
+class _BatchingListener(QueueListener):
+    """QueueListener that flushes its handlers once the queue runs dry rather than per record."""
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
 
 
 class Logger:
@@ -13,12 +43,21 @@ class Logger:
             os.makedirs(log_dir, exist_ok=True)
             log_file = os.path.join(log_dir, f"{datetime.now():%Y%m%d_%H%M%S}.log")
             level = getattr(logging, log_level.upper(), logging.INFO)
-            logging.basicConfig(
-                filename=log_file,
-                level=level,
-                format="%(asctime)s [%(levelname)s] %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
+            file_handler = _BatchedFileHandler(log_file)
+            file_handler.setFormatter(
+                logging.Formatter("%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
             )
+            # Callers only enqueue records; a background thread does the file writes, flushing
+            # once per burst, so a busy stretch costs one write per buffer-full instead of per record
+            log_queue = queue.SimpleQueue()
+            listener = _BatchingListener(log_queue, file_handler)
+            queue_handler = QueueHandler(log_queue)
+            # Only merge args into the message here; the file handler adds the timestamp and level
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
+            logging.basicConfig(level=level, handlers=[queue_handler])
+            listener.start()
+            # Drain whatever is still queued when the process exits
+            atexit.register(listener.stop)
             cls._instance.info("Logger initialized")
         return cls._instance
 
@@ -27,18 +66,22 @@ class Logger:
         self.log_dir = log_dir
         self.log_level = log_level
 
-    def debug(self, msg):
+    def isEnabledFor(self, level: int) -> bool:
+        """Return True if messages at the given level would be emitted."""
+        return logging.getLogger().isEnabledFor(level)
+
+    def debug(self, msg, *args, **kwargs):
         """Log a message at the DEBUG level."""
-        logging.debug(msg)
+        logging.debug(msg, *args, **kwargs)
 
-    def info(self, msg):
+    def info(self, msg, *args, **kwargs):
         """Log a message at the INFO level."""
-        logging.info(msg)
+        logging.info(msg, *args, **kwargs)
 
-    def warning(self, msg):
+    def warning(self, msg, *args, **kwargs):
         """Log a message at the WARNING level."""
-        logging.warning(msg)
+        logging.warning(msg, *args, **kwargs)
 
-    def error(self, msg):
+    def error(self, msg, *args, **kwargs):
         """Log a message at the ERROR level."""
-        logging.error(msg)
\ No newline at end of file
+        logging.error(msg, *args, **kwargs)
\ No newline at end of file
@@ -1,21 +1,351 @@
 import json
+import operator
+import pickle
 import re
-from typing import Any, Dict, Tuple
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from src.core.exceptions import ValidationError
 
+# DOTALL so a payload spanning lines (e.g. a length-prefixed frame holding pretty-printed JSON) parses
+_COMMAND_RE = re.compile(r'^(?P<collection>\w+)\.(?P<operation>\w+)\s*\{(?P<parameters>.*)\}$', re.S)
+
+# Comparison operators understood inside a field condition
+_OPERATORS = {
+    '$gt': operator.gt,
+    '$lt': operator.lt,
+    '$gte': operator.ge,
+    '$lte': operator.le,
+    '$eq': operator.eq,
+    '$ne': operator.ne,
+}
+
+# Stands in for a field missing from a document
+_MISSING = object()
+
+# Operators whose comparison can't raise for any pair of JSON values
+_TOTAL_OPERATORS = frozenset(('$eq', '$ne'))
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+@lru_cache(maxsize=1024)
+def _path_parts(key: str) -> Tuple[str, ...]:
+    """Split a dotted field path into its keys, once per distinct path."""
+    # Interned like stored field names, so lookups match by identity
+    return tuple(map(sys.intern, key.split('.')))
+
+# Runs of payload _scan_payload can jump over: anything but braces, commas, quotes and
+# backslashes, plus whole strings; the second form also skips commas, for when they can't split
+_PAYLOAD_SKIP_RE = re.compile(r'(?:[^{},"\\]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*")*')
+_PAYLOAD_SKIP_COMMAS_RE = re.compile(r'(?:[^{}"\\]+|"[^"\\]*(?:\\[\s\S][^"\\]*)*")*')
+# The rest of a string up to and including its closing quote, if it has one
+_STRING_REST_RE = re.compile(r'[^"\\]*(?:\\[\s\S][^"\\]*)*(")?')
+_BRACE_START_RE = re.compile(r'\s*\{')
+
+
+def _scan_payload(payload: str, find_comma: bool, state: Tuple[int, bool, bool]) -> Tuple[int, Tuple[int, bool, bool]]:
+    """Find where an update payload splits, jumping between significant characters with regexes.
+
+    state is (brace depth, inside a string, escape pending) and carries over from the comma
+    pass to the "}{" pass, as the character-by-character scan this replaces did. An escape
+    only stops a quote from opening or closing a string; an escaped brace or comma outside a
+    string still counts. Returns the split index, or -1, and the state where scanning stopped.
+    """
+    brace_count, in_string, escape = state
+    pos = 0
+    end = len(payload)
+    if escape and end:
+        # A backslash ending the previous pass escapes this pass's first character, which
+        # then only still counts if it is a brace or comma outside a string
+        pos = 0 if not in_string and payload[0] in '{},' else 1
+    while pos < end:
+        if in_string:
+            m = _STRING_REST_RE.match(payload, pos)
+            if m.group(1) is None:
+                # Unterminated: a lone trailing backslash leaves an escape pending
+                escape = m.end() < end
+                return -1, (brace_count, True, escape)
+            in_string = False
+            pos = m.end()
+            continue
+        skip = _PAYLOAD_SKIP_RE if find_comma and not brace_count else _PAYLOAD_SKIP_COMMAS_RE
+        pos = skip.match(payload, pos).end()
+        if pos >= end:
+            break
+        i = pos
+        char = payload[i]
+        pos += 1
+        if char == '"':
+            # Only an unterminated string is left for the skip pattern to stop at
+            in_string = True
+            continue
+        if char == '\\':
+            if pos >= end:
+                return -1, (brace_count, False, True)
+            i = pos
+            char = payload[i]
+            pos += 1
+        if char == '{':
+            brace_count += 1
+        elif char == '}':
+            brace_count -= 1
+            if not find_comma and brace_count == 0 and _BRACE_START_RE.match(payload, i + 1):
+                return i + 1, (brace_count, False, False)
+        elif char == ',' and find_comma and brace_count == 0:
+            return i, (brace_count, False, False)
+    return -1, (brace_count, in_string, False)
+
+
+# Queries longer than this are decoded afresh each time rather than held in the cache
+_QUERY_CACHE_MAX_LEN = 1024
+
+
+@lru_cache(maxsize=1024)
+def _decode_query_cached(payload: str) -> bytes:
+    """Decode a find or delete payload once, keeping it pickled so the cache holds nothing mutable."""
+    return pickle.dumps(_decode_query(payload), pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_query(payload: str) -> Dict[str, Any]:
+    """Decode the payload of a find or delete command into its query dict."""
+    query = json.loads('{' + payload + '}')
+    if not isinstance(query, dict):
+        raise ValidationError("Query must be a dictionary")
+    return query
+
+
+def _raiser(message: str) -> Predicate:
+    """Predicate that raises a ValidationError when evaluated.
+
+    Malformed parts of a query only fail once matching reaches them, as they do in
+    QueryParser.match, so a compiled query raises at the same point instead of up front.
+    """
+    def predicate(doc):
+        raise ValidationError(message)
+    return predicate
+
+
+def _raiser_compare(message: str) -> Callable[[Any, Any], bool]:
+    """Comparison that raises a ValidationError, for an operator match() would reject."""
+    def compare(val, expected):
+        raise ValidationError(message)
+    return compare
+
+
+def _cost(query: Dict[str, Any]) -> Optional[int]:
+    """Estimate how much work matching query does per document, or None if it may raise.
+
+    Plain fields cost one lookup per path step and $eq/$ne one comparison each; $and, $or
+    and $not add one for the nesting. Anything that can raise (ordering operators, unknown
+    operators, malformed conditions) gets None, as moving it would change which error is
+    raised, or whether one is.
+    """
+    total = 0
+    for key, cond in query.items():
+        if key in ('$and', '$or'):
+            if not isinstance(cond, list):
+                return None
+            total += 1
+            for c in cond:
+                cost = _cost(c) if isinstance(c, dict) and c else None
+                if cost is None:
+                    return None
+                total += cost
+        elif key == '$not':
+            cost = _cost(cond) if isinstance(cond, dict) and cond else None
+            if cost is None:
+                return None
+            total += 1 + cost
+        elif key.startswith('$'):
+            return None
+        elif isinstance(cond, dict):
+            if not cond.keys() <= _TOTAL_OPERATORS:
+                return None
+            total += len(_path_parts(key)) + len(cond)
+        else:
+            total += len(_path_parts(key))
+    return total
+
+
+def _cheapest_first(steps: List[Tuple[Predicate, Optional[int]]]) -> Tuple[Predicate, ...]:
+    """Order (predicate, cost) steps so each run of steps that can't raise goes cheapest first.
+
+    Such steps have no side effects, so an all/any over them gives the same answer in any
+    order. A step that may raise stays in place, with the same steps before it.
+    """
+    ordered = []
+    run = []
+    for predicate, cost in steps:
+        if cost is None:
+            run.sort(key=lambda step: step[1])
+            ordered.extend(p for p, _ in run)
+            run = []
+            ordered.append(predicate)
+        else:
+            run.append((predicate, cost))
+    run.sort(key=lambda step: step[1])
+    ordered.extend(p for p, _ in run)
+    return tuple(ordered)
+
+
+def _compile_all(query: Dict[str, Any]) -> Predicate:
+    """Compile a query dict: each key is a condition and all of them must hold."""
+    if len(query) > 1 and all(
+        not isinstance(cond, dict) and not key.startswith('$') and '.' not in key
+        for key, cond in query.items()
+    ):
+        return _compile_equalities(tuple((sys.intern(key), cond) for key, cond in query.items()))
+    steps = []
+    for key, cond in query.items():
+        if key == '$and':
+            steps.append((_compile_and(cond), _cost({key: cond})))
+        elif key == '$or':
+            steps.append((_compile_or(cond), _cost({key: cond})))
+            # match() returns the $or outcome as the result, so later keys are never checked
+            break
+        elif key == '$not':
+            steps.append((_compile_not(cond), _cost({key: cond})))
+        elif key.startswith('$'):
+            steps.append((_raiser(f"Unknown top-level operator: {key}"), None))
+            break
+        else:
+            steps.append((_compile_field(key, cond), _cost({key: cond})))
+    steps = _cheapest_first(steps)
+    if len(steps) == 1:
+        return steps[0]
+
+    def predicate(doc):
+        for step in steps:
+            if not step(doc):
+                return False
+        return True
+    return predicate
+
+
+def _compile_equalities(pairs: Tuple[Tuple[str, Any], ...]) -> Predicate:
+    """Compile several top-level field == value conditions into one loop without a call per field."""
+    def predicate(doc):
+        if not isinstance(doc, dict):
+            return False
+        for field, expected in pairs:
+            val = doc.get(field, _MISSING)
+            if val is _MISSING or val != expected:
+                return False
+        return True
+    return predicate
+
+
+def _compile_branches(op: str, cond: Any) -> Tuple[Predicate, ...]:
+    """Compile the condition list of $and/$or, keeping malformed entries as raisers in place.
+
+    Branches that can't raise are reordered cheapest first within each run between ones that can.
+    """
+    branches = []
+    for c in cond:
+        if not isinstance(c, dict):
+            branches.append((_raiser(f"Each condition in '{op}' must be a dictionary, got {type(c).__name__}"), None))
+        elif not c:
+            branches.append((_raiser(f"Empty condition in '{op}' operator"), None))
+        else:
+            branches.append((_compile_all(c), _cost(c)))
+    return _cheapest_first(branches)
+
+
+def _compile_and(cond: Any) -> Predicate:
+    if not isinstance(cond, list):
+        return _raiser(f"Operator '$and' requires a list of conditions, got {type(cond).__name__}")
+    branches = _compile_branches('$and', cond)
+
+    def predicate(doc):
+        for branch in branches:
+            if not branch(doc):
+                return False
+        return True
+    return predicate
+
+
+def _compile_or(cond: Any) -> Predicate:
+    if not isinstance(cond, list):
+        return _raiser(f"Operator '$or' requires a list of conditions, got {type(cond).__name__}")
+    branches = _compile_branches('$or', cond)
+
+    def predicate(doc):
+        for branch in branches:
+            if branch(doc):
+                return True
+        return False
+    return predicate
+
+
+def _compile_not(cond: Any) -> Predicate:
+    if not isinstance(cond, dict):
+        return _raiser(f"Operator '$not' requires a condition dictionary, got {type(cond).__name__}")
+    if not cond:
+        return _raiser("Empty condition in '$not' operator")
+    inner = _compile_all(cond)
+    return lambda doc: not inner(doc)
+
+
+def _compile_field(key: str, cond: Any) -> Predicate:
+    """Compile a condition on one (possibly dotted) field path."""
+    parts = _path_parts(key)
+    if isinstance(cond, dict):
+        checks = []
+        for op, expected in cond.items():
+            compare = _OPERATORS.get(op)
+            if compare is None:
+                # Raised from inside the comparison loop too, once the field has been found
+                checks.append((_raiser_compare(f"Unsupported operator: {op}"), expected))
+            else:
+                checks.append((compare, expected))
+        checks = tuple(checks)
+
+        def test(val):
+            for compare, expected in checks:
+                if not compare(val, expected):
+                    return False
+            return True
+    else:
+        def test(val):
+            return not (val != cond)
+
+    if len(parts) == 1:
+        field = parts[0]
+
+        def predicate(doc):
+            if isinstance(doc, dict):
+                val = doc.get(field, _MISSING)
+                if val is not _MISSING:
+                    return test(val)
+            return False
+        return predicate
+
+    def predicate(doc):
+        val = doc
+        for p in parts:
+            if isinstance(val, dict):
+                val = val.get(p, _MISSING)
+                if val is _MISSING:
+                    return False
+            else:
+                return False
+        return test(val)
+    return predicate
+
+
 class QueryParser:
     @staticmethod
     def parse(command: str) -> Dict[str, Any]:
         """Parse a database command into its components: collection, operation, and parameters."""
         if not command or not command.strip():
             raise ValidationError("Command cannot be empty")
-        match = re.match(r'^(?P<collection>\w+)\.(?P<operation>\w+)\s*\{(?P<parameters>.*)\}$', command.strip())
+        match = _COMMAND_RE.match(command.strip())
         if not match:
             raise ValidationError("Command format should be <collection>.<operation>{parameters}")
         
-        collection = match.group('collection')
-        op = match.group('operation')
-        payload = match.group('parameters').strip()
+        collection, op, payload = match.group('collection', 'operation', 'parameters')
+        payload = payload.strip()
         
         try:
             if op == 'add':
@@ -37,9 +367,12 @@ class QueryParser:
             elif op in ('find', 'delete'):
                 if not payload:
                     return {'operation': op, 'collection': collection, 'query': {}}
-                query = json.loads('{' + payload + '}')
-                if not isinstance(query, dict):
-                    raise ValidationError("Query must be a dictionary")
+                # Clients repeat the same finds and deletes, so short ones are decoded once;
+                # unpickling hands every caller its own copy and beats decoding the JSON again
+                if len(payload) <= _QUERY_CACHE_MAX_LEN:
+                    query = pickle.loads(_decode_query_cached(payload))
+                else:
+                    query = _decode_query(payload)
                 return {'operation': op, 'collection': collection, 'query': query}
             
             elif op == 'update':
@@ -59,47 +392,11 @@ class QueryParser:
         payload = payload.strip()
         if not payload:
             raise ValidationError("Update payload cannot be empty")
-        brace_count = 0
-        in_string = False
-        escape = False
-        split_index = -1
-        
-        for i, char in enumerate(payload):
-            if char == '"' and not escape:
-                in_string = not in_string
-            elif char == '\\' and not escape:
-                escape = True
-                continue
-            elif not in_string:
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                elif char == ',' and brace_count == 0:
-                    split_index = i
-                    break
-            escape = False
-        
+        # First look for a top-level comma; failing that, for "}" followed by "{"
+        split_index, state = _scan_payload(payload, True, (0, False, False))
         if split_index == -1:
-            for i, char in enumerate(payload):
-                if char == '"' and not escape:
-                    in_string = not in_string
-                elif char == '\\' and not escape:
-                    escape = True
-                    continue
-                elif not in_string:
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            j = i + 1
-                            while j < len(payload) and payload[j].isspace():
-                                j += 1
-                            if j < len(payload) and payload[j] == '{':
-                                split_index = i + 1
-                                break
-                escape = False
+            split_index, state = _scan_payload(payload, False, state)
+        brace_count = state[0]
         
         if split_index == -1 or brace_count != 0:
             raise ValidationError("Invalid update payload: must contain query and update JSON objects separated by comma or whitespace")
@@ -112,6 +409,16 @@ class QueryParser:
         
         return query_str, update_str
 
+    @staticmethod
+    def compile(query: Dict[str, Any]) -> Predicate:
+        """Turn a query into a predicate that gives the same answer as match() for any document.
+
+        The query is walked once into nested closures, so scanning a collection doesn't
+        re-dispatch on every operator and key per document. Not cached: a key for the query
+        dict costs about as much to build as the closures, which are cheap next to a scan.
+        """
+        return _compile_all(query)
+
     @staticmethod
     def match(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
         """Check if a document matches the given query conditions."""
@@ -147,12 +454,11 @@ class QueryParser:
             elif key.startswith('$'):
                 raise ValidationError(f"Unknown top-level operator: {key}")
             else:
-                parts = key.split('.')
                 val = doc
-                for p in parts:
-                    if isinstance(val, dict) and p in val:
-                        val = val[p]
-                    else:
+                for p in _path_parts(key):
+                    # One lookup per step; the sentinel tells a missing key from a stored None
+                    val = val.get(p, _MISSING) if isinstance(val, dict) else _MISSING
+                    if val is _MISSING:
                         return False
                 if isinstance(cond, dict):
                     for op, expected in cond.items():
@@ -165,10 +471,7 @@ class QueryParser:
     @staticmethod
     def _compare(val: Any, op: str, expected: Any) -> bool:
         """Compare a document value against an expected value using a specified operator."""
-        if op == '$gt': return val > expected
-        if op == '$lt': return val < expected
-        if op == '$gte': return val >= expected
-        if op == '$lte': return val <= expected
-        if op == '$eq': return val == expected
-        if op == '$ne': return val != expected
-        raise ValidationError(f"Unsupported operator: {op}")
\ No newline at end of file
+        compare = _OPERATORS.get(op)
+        if compare is None:
+            raise ValidationError(f"Unsupported operator: {op}")
+        return compare(val, expected)
\ No newline at end of file
@@ -0,0 +1,19 @@
+import os
+from typing import List
+
+# data_root -> (directory mtime_ns, sorted database names)
+_listing_cache = {}
+
+
+def list_databases(data_root: str) -> List[str]:
+    """Return the sorted names of database directories under data_root."""
+    # Creating, deleting or renaming an entry bumps the directory's mtime
+    mtime = os.stat(data_root).st_mtime_ns
+    cached = _listing_cache.get(data_root)
+    if cached is not None and cached[0] == mtime:
+        return list(cached[1])
+    with os.scandir(data_root) as entries:
+        databases = sorted(entry.name for entry in entries if entry.is_dir())
+    # Stat before scanning: a change mid-scan leaves a stale mtime, forcing a rescan next time
+    _listing_cache[data_root] = (mtime, databases)
+    return list(databases)
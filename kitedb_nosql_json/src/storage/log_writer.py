@@ -0,0 +1,78 @@
+import queue
+from threading import Event, Lock, Thread
+from typing import Any, Optional
+
+
+class JournalTicket:
+    """Completion handle for one submitted journal record."""
+
+    __slots__ = ("_event", "error")
+
+    def __init__(self):
+        self._event = Event()
+        self.error: Optional[BaseException] = None
+
+    def done(self) -> bool:
+        """Return True once the record has been written, successfully or not."""
+        return self._event.is_set()
+
+    def wait(self) -> None:
+        """Block until the record is on disk, raising the write error if it failed."""
+        self._event.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        self.error = error
+        self._event.set()
+
+
+class LogWriter:
+    """Background thread that appends queued journal records and syncs once per batch.
+
+    Records that arrive while a sync is in progress are written together by the next
+    one, so concurrent committers share the cost of the fsync instead of paying it each.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = Lock()
+
+    def submit(self, engine: Any, record: bytes) -> JournalTicket:
+        """Queue an encoded record for engine's journal; records are written in submission order."""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = Thread(target=self._run, name="kitedb-log-writer", daemon=True)
+                    self._thread.start()
+        ticket = JournalTicket()
+        self._queue.put((engine, record, ticket))
+        return ticket
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting rather than holding the batch open for more
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_engine = {}
+            for engine, record, ticket in batch:
+                records, tickets = by_engine.setdefault(engine, ([], []))
+                records.append(record)
+                tickets.append(ticket)
+            for engine, (records, tickets) in by_engine.items():
+                error = None
+                try:
+                    engine.write_records(records)
+                except BaseException as e:
+                    error = e
+                for ticket in tickets:
+                    ticket._finish(error)
+
+
+# Shared by every StorageEngine in the process
+log_writer = LogWriter()
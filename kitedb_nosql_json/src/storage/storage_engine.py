@@ -1,47 +1,136 @@
+import io
 import os
 import re
 import pickle
-from typing import Dict, Any
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 from src.config import config
 from src.config import logger
 from src.core.exceptions import StorageError, KiteDBError
 from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+from Crypto.Util.Padding import unpad
 import shutil
+from threading import Lock, local
+from src.storage.log_writer import log_writer
+
+# Journal records are a 4-byte big-endian length followed by the encrypted record
+_RECORD_HEADER = struct.Struct(">I")
+
+# Encrypted data is the magic, a nonce, the ciphertext and the GCM tag; anything without
+# the magic is from the older IV + AES-CBC format
+_GCM_MAGIC = b"KDB\x02"
+_GCM_NONCE_SIZE = 12
+_GCM_TAG_SIZE = 16
+_GCM_OVERHEAD = len(_GCM_MAGIC) + _GCM_NONCE_SIZE + _GCM_TAG_SIZE
+
+# Database names double as directory names
+_DB_NAME_RE = re.compile(r"[a-zA-Z0-9_-]+")
+# Names _chunk_path gives chunk files
+_CHUNK_NAME_RE = re.compile(r"chunk_(0|[1-9][0-9]*)\.bin")
+
+# Protocol 5 is the most compact and fastest to produce; loading reads any protocol
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """Unpickler for stored data, which is only ever dicts, lists, tuples and JSON scalars.
+
+    Those load without looking up any global, so refusing every lookup means a crafted
+    file can't name a callable to run.
+    """
+
+    def find_class(self, module, name):
+        raise StorageError(f"Refusing to load {module}.{name} from storage")
+
+
+def _unpickle(data: bytes) -> Any:
+    """Load a pickle written by this module, allowing only plain data."""
+    return _DataUnpickler(io.BytesIO(data)).load()
+
+
+def _apply_journal_op(collections: Dict[str, list], op: Tuple) -> None:
+    """Replay one journaled document change onto loaded collections."""
+    action, name, payload = op
+    if action == "insert":
+        collections.setdefault(name, []).extend(payload)
+        return
+    docs = collections.get(name)
+    if docs is None:
+        return
+    if action == "update":
+        for idx, doc in payload:
+            docs[idx] = doc
+    elif action == "delete":
+        removed = set(payload)
+        collections[name] = [doc for idx, doc in enumerate(docs) if idx not in removed]
 
 
 class StorageEngine:
     def __init__(self, db_name: str):
         """Initialize the StorageEngine with a database name and set up encryption."""
-        """Creates a new collection with an optional schema, validating the name."""
-        if not re.match(r"^[a-zA-Z0-9_-]+$", db_name):
+        if not _DB_NAME_RE.fullmatch(db_name):
             raise KiteDBError(
                 "Database name must contain only letters, numbers, underscores, or hyphens"
             )
         self.db_name = db_name
         self.db_path = os.path.join(config.get("storage.data_root"), db_name)
         os.makedirs(self.db_path, exist_ok=True)
+        self.abs_db_path = os.path.abspath(self.db_path)
         self.key = config.get("storage.encryption_key").encode()
         if len(self.key) not in (16, 24, 32):
             raise StorageError("Encryption key must be 16, 24, or 32 bytes")
-        logger.debug(f"StorageEngine for '{db_name}' at '{self.db_path}'")
+        # Document changes are appended here between full snapshots
+        self.journal_path = os.path.join(self.db_path, "journal.wal")
+        self.compact_every = config.get("storage.compact_every", 1000)
+        self._journal = None
+        self._journal_lock = Lock()
+        # With fsync on, records go through the shared log writer so concurrent commits share a sync
+        self.journal_fsync = config.get("storage.journal_fsync", False)
+        self._last_ticket = None
+        self._local = local()
+        # Sequence number of the last journal record, and records written since the last snapshot
+        self._journal_seq = 0
+        self.journal_records = 0
+        # Collection -> the chunk file holding it, and collections changed since they were last written
+        self._chunk_map: Dict[str, int] = {}
+        self.dirty = set()
+        logger.debug("StorageEngine for '%s' at '%s'", db_name, self.db_path)
 
     def _chunk_path(self, chunk_id: int) -> str:
         """Generate the file path for a specific data chunk."""
         return os.path.join(self.db_path, f"chunk_{chunk_id}.bin")
 
     def _encrypt(self, data: bytes) -> bytes:
-        """Encrypt the provided data using AES-CBC with padding."""
-        cipher = AES.new(self.key, AES.MODE_CBC)
-        ct_bytes = cipher.encrypt(pad(data, AES.block_size))
-        return cipher.iv + ct_bytes
+        """Encrypt the provided data using AES-GCM, which also authenticates it."""
+        nonce = os.urandom(_GCM_NONCE_SIZE)
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        ct_bytes, tag = cipher.encrypt_and_digest(data)
+        return _GCM_MAGIC + nonce + ct_bytes + tag
 
     def _decrypt(self, data: bytes) -> bytes:
+        """Decrypt data written by _encrypt, or by the AES-CBC format used before it."""
+        # Slices of a memoryview share the buffer, so the ciphertext is not copied before decryption
+        view = memoryview(data)
+        if data.startswith(_GCM_MAGIC) and len(data) >= _GCM_OVERHEAD:
+            nonce = bytes(view[len(_GCM_MAGIC):len(_GCM_MAGIC) + _GCM_NONCE_SIZE])
+            cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+            try:
+                return cipher.decrypt_and_verify(
+                    view[len(_GCM_MAGIC) + _GCM_NONCE_SIZE:-_GCM_TAG_SIZE], view[-_GCM_TAG_SIZE:]
+                )
+            except ValueError:
+                # A CBC file whose random IV happens to start with the magic; try it as one
+                pass
+        return self._decrypt_cbc(view)
+
+    def _decrypt_cbc(self, data: bytes) -> bytes:
         """Decrypt the provided data using AES-CBC with padding."""
         if len(data) < 16:
             raise StorageError("Invalid encrypted data: too short")
-        iv = data[:16]
-        ct = data[16:]
+        view = memoryview(data)
+        iv = bytes(view[:16])
+        ct = view[16:]
         cipher = AES.new(self.key, AES.MODE_CBC, iv=iv)
         try:
             pt = unpad(cipher.decrypt(ct), AES.block_size)
@@ -49,51 +138,296 @@ class StorageEngine:
         except ValueError as e:
             raise StorageError(f"Decryption failed: {e}")
 
+    def _read_chunk(self, chunk_id: int) -> bytes:
+        """Read and decrypt one chunk file, returning its pickled contents."""
+        path = self._chunk_path(chunk_id)
+        try:
+            with open(path, "rb") as f:
+                encrypted = f.read()
+            return self._decrypt(encrypted)
+        except Exception as e:
+            logger.error("Failed to load chunk %s: %s", path, e)
+            raise StorageError(f"Load error: {e}")
+
     def load(self) -> Dict[str, Any]:
         """Load and decrypt all data chunks from disk into a dictionary."""
         data = {"collections": {}, "schemas": {}}
-        chunk = 0
-        while True:
-            path = self._chunk_path(chunk)
-            if not os.path.isfile(path):
-                break
+        # Journal position each collection's chunk had reached when it was written
+        coll_seqs = {}
+        snapshot_seq = 0
+        # One directory listing instead of a stat per chunk; loading still stops at the first gap
+        chunk_ids = set()
+        with os.scandir(self.db_path) as entries:
+            for entry in entries:
+                m = _CHUNK_NAME_RE.fullmatch(entry.name)
+                if m and entry.is_file():
+                    chunk_ids.add(int(m.group(1)))
+        chunk_count = 0
+        while chunk_count in chunk_ids:
+            chunk_count += 1
+        if chunk_count > 1:
+            # File reads and AES release the GIL, so chunks are read and decrypted side by side;
+            # map() still hands them back in chunk order
+            with ThreadPoolExecutor(max_workers=min(chunk_count, 8, os.cpu_count() or 1)) as pool:
+                payloads = list(pool.map(self._read_chunk, range(chunk_count)))
+        else:
+            payloads = [self._read_chunk(chunk) for chunk in range(chunk_count)]
+        for chunk, decrypted in enumerate(payloads):
             try:
-                with open(path, "rb") as f:
-                    encrypted = f.read()
-                decrypted = self._decrypt(encrypted)
-                part = pickle.loads(decrypted)
+                part = _unpickle(decrypted)
+                seq = part.get("journal_seq", 0)
                 for coll, docs in part.get("collections", {}).items():
                     data["collections"].setdefault(coll, []).extend(docs)
+                    self._chunk_map[coll] = chunk
+                    coll_seqs[coll] = seq
                 data["schemas"].update(part.get("schemas", {}))
-                logger.debug(f"Loaded chunk {chunk}")
+                snapshot_seq = max(snapshot_seq, seq)
+                logger.debug("Loaded chunk %s", chunk)
             except Exception as e:
-                logger.error(f"Failed to load chunk {path}: {e}")
+                logger.error("Failed to load chunk %s: %s", self._chunk_path(chunk), e)
                 raise StorageError(f"Load error: {e}")
-            chunk += 1
+        # Older snapshots copied every schema into every chunk, including ones since dropped
+        data["schemas"] = {
+            name: schema for name, schema in data["schemas"].items() if name in data["collections"]
+        }
+        self._journal_seq = snapshot_seq
+        self._replay_journal(data["collections"], coll_seqs, snapshot_seq)
         return data
 
-    def save(self, data: Dict[str, Any]) -> None:
-        """Save the provided data to disk in encrypted chunks, checking disk space."""
-        total, used, free = shutil.disk_usage(self.db_path)
-        estimated_size = len(pickle.dumps(data)) * 1.5
-        if free < estimated_size:
-            raise StorageError("Insufficient disk space to save data")
+    def _replay_journal(self, collections: Dict[str, list], coll_seqs: Dict[str, int], snapshot_seq: int) -> None:
+        """Apply journal records newer than the chunk each change belongs to."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        pos = 0
+        while pos + _RECORD_HEADER.size <= len(raw):
+            length, = _RECORD_HEADER.unpack_from(raw, pos)
+            end = pos + _RECORD_HEADER.size + length
+            if end > len(raw):
+                break
+            seq, ops = _unpickle(self._decrypt(raw[pos + _RECORD_HEADER.size:end]))
+            pos = end
+            applied = False
+            for op in ops:
+                name = op[1]
+                # A chunk written before the journal was cleared already contains these; a
+                # collection in no chunk was dropped by a snapshot at least as new as any chunk
+                if seq <= coll_seqs.get(name, snapshot_seq):
+                    continue
+                _apply_journal_op(collections, op)
+                # Memory is now ahead of that collection's chunk
+                self.dirty.add(name)
+                applied = True
+            self._journal_seq = max(self._journal_seq, seq)
+            if applied:
+                self.journal_records += 1
+        if pos < len(raw):
+            # A record cut short by a crash was never acknowledged; drop it
+            logger.warning("Discarding truncated journal tail in '%s'", self.journal_path)
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(pos)
+        logger.debug("Replayed %s journal records for '%s'", self.journal_records, self.db_name)
+
+    def append_ops(self, ops: List[Tuple]) -> int:
+        """Append document changes to the journal as one record; returns records since the last snapshot.
+
+        With storage.journal_fsync set the record is only queued; call sync() to wait for it.
+        """
+        seq = self._journal_seq + 1
+        encrypted = self._encrypt(pickle.dumps((seq, ops), _PICKLE_PROTOCOL))
+        record = _RECORD_HEADER.pack(len(encrypted)) + encrypted
+        if self.journal_fsync:
+            ticket = log_writer.submit(self, record)
+            self._last_ticket = ticket
+            self._local.ticket = ticket
+        else:
+            self.write_records([record])
+        self._journal_seq = seq
+        self.journal_records += 1
+        return self.journal_records
 
+    def write_records(self, records: List[bytes]) -> None:
+        """Append encoded journal records in one write, syncing them to disk when journal_fsync is set."""
+        with self._journal_lock:
+            start = None
+            try:
+                if self._journal is None:
+                    self._journal = open(self.journal_path, "ab")
+                start = self._journal.tell()
+                self._journal.write(b"".join(records))
+                self._journal.flush()
+                if self.journal_fsync:
+                    os.fsync(self._journal.fileno())
+            except Exception as e:
+                logger.error("Failed to append to journal %s: %s", self.journal_path, e)
+                self._discard_partial_write(start)
+                raise StorageError(f"Save error: {e}")
+
+    def _discard_partial_write(self, start) -> None:
+        """Cut the journal back to where a failed write began, so later records aren't lost behind it."""
+        journal, self._journal = self._journal, None
+        try:
+            if journal is not None:
+                journal.close()
+        except Exception:
+            pass
+        if start is not None:
+            try:
+                os.truncate(self.journal_path, start)
+            except OSError as e:
+                logger.error("Failed to truncate journal %s: %s", self.journal_path, e)
+
+    def sync(self) -> None:
+        """Wait until the calling thread's queued journal records are on disk, raising if writing failed."""
+        ticket = getattr(self._local, "ticket", None)
+        if ticket is not None:
+            self._local.ticket = None
+            ticket.wait()
+
+    def _clear_journal(self) -> None:
+        """Drop journal records once a snapshot includes them."""
+        ticket, self._last_ticket = self._last_ticket, None
+        if ticket is not None:
+            # Let queued records land before the file goes; the snapshot already holds their changes
+            try:
+                ticket.wait()
+            except StorageError:
+                pass
+        with self._journal_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+        self.journal_records = 0
+
+    def mark_dirty(self, name: str) -> None:
+        """Note that a collection changed, so the next save rewrites its chunk."""
+        self.dirty.add(name)
+
+    def _assign_chunks(self, collections: Dict[str, list], chunk_size: int) -> set:
+        """Update the collection-to-chunk map for dirty collections and return the chunk IDs to rewrite."""
+        chunk_map = self._chunk_map
+        dirty_chunks = set()
+        # Collections the map has never seen (e.g. the first save) are written like dirty ones
+        names = self.dirty.union(name for name in collections if name not in chunk_map)
+        counts: Dict[int, int] = {}
+        for cid in chunk_map.values():
+            counts[cid] = counts.get(cid, 0) + 1
+        for name in sorted(names):
+            chunk_id = chunk_map.get(name)
+            if name not in collections:
+                if chunk_id is not None:
+                    # Dropped: its chunk is rewritten without it
+                    del chunk_map[name]
+                    counts[chunk_id] -= 1
+                    dirty_chunks.add(chunk_id)
+                continue
+            if chunk_id is None:
+                # New collections fill the first chunk with room, like the original sequential layout
+                chunk_id = 0
+                while counts.get(chunk_id, 0) >= chunk_size:
+                    chunk_id += 1
+                chunk_map[name] = chunk_id
+                counts[chunk_id] = counts.get(chunk_id, 0) + 1
+            dirty_chunks.add(chunk_id)
+        return dirty_chunks
+
+    def _write_chunk(self, item: Tuple[int, bytes]) -> None:
+        """Encrypt one pickled chunk and swap it in for its file.
+
+        The chunk is written beside the old file and renamed over it, so a crash mid-write
+        leaves the previous version in place rather than a truncated one.
+        """
+        chunk_id, payload = item
+        path = self._chunk_path(chunk_id)
+        tmp = path + ".tmp"
+        try:
+            encrypted = self._encrypt(payload)
+            with open(tmp, "wb") as f:
+                f.write(encrypted)
+                if self.journal_fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp, path)
+            logger.debug("Saved chunk %s", chunk_id)
+        except Exception as e:
+            logger.error("Failed to save chunk %s: %s", path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise StorageError(f"Save error: {e}")
+
+    def _sync_dir(self) -> None:
+        """Make completed renames in the database directory durable."""
+        try:
+            fd = os.open(self.db_path, os.O_RDONLY)
+        except OSError:
+            # Directories can't be opened this way on Windows, where the rename is durable already
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def save(self, data: Dict[str, Any]) -> None:
+        """Encrypt and write the chunks holding collections changed since the last save, checking disk space."""
         collections = data.get("collections", {})
         schemas = data.get("schemas", {})
-        docs = list(collections.items())
         chunk_size = config.get("storage.chunk_size")
-        for i in range(0, len(docs), chunk_size):
-            chunk_id = i // chunk_size
-            part = dict(docs[i : i + chunk_size])
-            chunk_data = {"collections": part, "schemas": schemas}
-            path = self._chunk_path(chunk_id)
+        dirty_chunks = self._assign_chunks(collections, chunk_size)
+        # Chunks load in sequence until one is missing, so emptied chunks stay as empty files
+        # unless they are at the end
+        chunk_count = max(self._chunk_map.values(), default=-1) + 1
+        # Always keep chunk 0, even for an empty database, so the first chunk always exists
+        chunk_count = max(1, chunk_count)
+        if not os.path.isfile(self._chunk_path(0)):
+            dirty_chunks.add(0)
+        members: Dict[int, List[str]] = {}
+        for name, chunk_id in self._chunk_map.items():
+            if chunk_id in dirty_chunks:
+                members.setdefault(chunk_id, []).append(name)
+
+        # Pickling holds the GIL, so it runs here; the encrypted sizes follow from the pickled ones,
+        # which is all the disk-space check needs
+        encoded = []
+        for chunk_id in sorted(cid for cid in dirty_chunks if cid < chunk_count):
+            names = members.get(chunk_id, [])
+            chunk_data = {
+                "collections": {name: collections[name] for name in names},
+                "schemas": {name: schemas[name] for name in names if name in schemas},
+                "journal_seq": self._journal_seq,
+            }
             try:
-                serialized = pickle.dumps(chunk_data)
-                encrypted = self._encrypt(serialized)
-                with open(path, "wb") as f:
-                    f.write(encrypted)
-                logger.info(f"Saved chunk {chunk_id}")
+                encoded.append((chunk_id, pickle.dumps(chunk_data, _PICKLE_PROTOCOL)))
             except Exception as e:
-                logger.error(f"Failed to save chunk {path}: {e}")
-                raise StorageError(f"Save error: {e}")
\ No newline at end of file
+                logger.error("Failed to save chunk %s: %s", self._chunk_path(chunk_id), e)
+                raise StorageError(f"Save error: {e}")
+        total, used, free = shutil.disk_usage(self.db_path)
+        if free < sum(len(payload) + _GCM_OVERHEAD for _, payload in encoded) * 1.5:
+            raise StorageError("Insufficient disk space to save data")
+
+        if len(encoded) > 1:
+            # AES and file writes release the GIL, so separate chunks overlap across threads
+            with ThreadPoolExecutor(max_workers=min(len(encoded), os.cpu_count() or 1)) as pool:
+                list(pool.map(self._write_chunk, encoded))
+        else:
+            for item in encoded:
+                self._write_chunk(item)
+        # Chunks left over from a larger earlier save would otherwise be loaded again
+        stale = chunk_count
+        while os.path.isfile(self._chunk_path(stale)):
+            os.remove(self._chunk_path(stale))
+            stale += 1
+        if self.journal_fsync:
+            # The journal is the only other copy of these changes, so the chunks must be on disk first
+            self._sync_dir()
+        self.dirty.clear()
+        self._clear_journal()
@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+from src.auth.login_throttle import LoginThrottle
+from src.auth.session_store import SessionStore
+
+
+class LoginThrottleTest(unittest.TestCase):
+    @mock.patch("src.auth.login_throttle.time.monotonic")
+    def test_locks_out_after_max_failures_until_lockout_passes(self, monotonic):
+        monotonic.return_value = 100.0
+        throttle = LoginThrottle(max_failures=3, lockout=30)
+        for _ in range(2):
+            throttle.record_failure("1.2.3.4")
+        self.assertFalse(throttle.is_locked("1.2.3.4"))
+        throttle.record_failure("1.2.3.4")
+        self.assertTrue(throttle.is_locked("1.2.3.4"))
+        self.assertFalse(throttle.is_locked("5.6.7.8"))
+
+        monotonic.return_value = 129.0
+        self.assertTrue(throttle.is_locked("1.2.3.4"))
+        monotonic.return_value = 130.0
+        self.assertFalse(throttle.is_locked("1.2.3.4"))
+
+    def test_reset_forgets_failures(self):
+        throttle = LoginThrottle(max_failures=1, lockout=30)
+        throttle.record_failure("u")
+        self.assertTrue(throttle.is_locked("u"))
+        throttle.reset("u")
+        self.assertFalse(throttle.is_locked("u"))
+
+
+class SessionStoreTest(unittest.TestCase):
+    @mock.patch("src.auth.session_store.time.monotonic")
+    def test_tokens_expire_after_ttl(self, monotonic):
+        monotonic.return_value = 100.0
+        sessions = SessionStore(ttl=60)
+        token = sessions.issue("alice")
+        self.assertEqual(sessions.resolve(token), "alice")
+        self.assertIsNone(sessions.resolve("not-a-token"))
+
+        monotonic.return_value = 160.0
+        self.assertIsNone(sessions.resolve(token))
+        # Expired tokens are forgotten, not revived
+        monotonic.return_value = 100.0
+        self.assertIsNone(sessions.resolve(token))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.config import config
+from main import KiteDBConsole
+
+
+class ConsoleTestCase(unittest.TestCase):
+    """A logged-in admin console whose data root is a throwaway directory."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        self.data_root = config.config["storage"]["data_root"]
+        config.config["storage"]["data_root"] = os.path.join(self.tmp, "db")
+        os.chdir(self.tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.console = KiteDBConsole()
+        self.console.authenticated = True
+        self.console.current_user = "admin"
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        config.config["storage"]["data_root"] = self.data_root
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def run_console(self, method, arg=""):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            method(arg)
+        return out.getvalue()
+
+
+class ConsoleTransactionTest(ConsoleTestCase):
+    def test_switching_database_rolls_back_open_transaction(self):
+        self.run_console(self.console.handle_use, "a")
+        db = self.console.current_db
+        db.create_collection("c")
+        self.run_console(self.console.handle_begin)
+        db.get_collection("c").insert({"k": 1})
+
+        self.assertIn("Rolled back open transaction", self.run_console(self.console.handle_use, "b"))
+        self.run_console(self.console.handle_use, "a")
+        self.assertIs(self.console.current_db, db)
+        self.assertIn("No active transaction", self.run_console(self.console.handle_commit))
+        self.assertEqual(db.get_collection("c").find({}), [])
+
+    def test_leaving_database_rolls_back_open_transaction(self):
+        self.run_console(self.console.handle_use, "a")
+        db = self.console.current_db
+        db.create_collection("c")
+        self.run_console(self.console.handle_begin)
+        db.get_collection("c").insert({"k": 1})
+
+        self.run_console(self.console.handle_exitdb)
+        self.assertFalse(db.transaction.active)
+        self.assertEqual(db.get_collection("c").find({}), [])
+
+
+
+class ConsoleCommandSplitTest(ConsoleTestCase):
+    def test_tab_separates_command_and_argument(self):
+        self.run_console(self.console.handle_command, "use\ta")
+        self.assertEqual(self.console.current_db.name, "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
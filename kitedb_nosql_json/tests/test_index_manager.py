@@ -0,0 +1,43 @@
+import unittest
+
+from src.index.index_manager import IndexManager
+
+
+class QueryRangeTest(unittest.TestCase):
+    def setUp(self):
+        self.index = IndexManager()
+        self.index.bulk_build([{"n": 5}, {"n": 1}, {"n": 3}, {"n": 1.5}, {"s": "x"}])
+
+    def test_bounds(self):
+        self.assertEqual(self.index.query_range("n", {"$gt": 1}), [0, 2, 3])
+        self.assertEqual(self.index.query_range("n", {"$gte": 1, "$lt": 5}), [1, 2, 3])
+        self.assertEqual(self.index.query_range("n", {"$lte": 3}), [1, 2, 3])
+        self.assertEqual(self.index.query_range("n", {"$gt": 5}), [])
+
+    def test_new_keys_are_seen(self):
+        self.index.query_range("n", {"$gt": 0})
+        self.index.add("n", 2, 5)
+        self.assertEqual(self.index.query_range("n", {"$gt": 1, "$lt": 3}), [3, 5])
+
+    def test_declines_what_it_cannot_answer_exactly(self):
+        self.assertIsNone(self.index.query_range("n", {"$gt": "a"}))
+        self.assertIsNone(self.index.query_range("n", {"$gt": float("nan")}))
+        self.index.add("n", "text", 5)
+        self.assertIsNone(self.index.query_range("n", {"$gt": 1}))
+
+
+class CompactTest(unittest.TestCase):
+    def test_later_ids_move_down_past_removed_ones(self):
+        index = IndexManager()
+        index.bulk_build([{"n": 1}, {"n": 2}, {"n": 1}, {"n": 3}, {"s": "x"}])
+        # Documents 1 and 3 are deleted; the rest become [{"n": 1}, {"n": 1}, {"s": "x"}]
+        index.compact([1, 3])
+        self.assertEqual(index.query("n", 1), [0, 1])
+        self.assertEqual(index.query("n", 2), [])
+        self.assertEqual(index.query("n", 3), [])
+        self.assertEqual(index.query("s", "x"), [2])
+        self.assertEqual(index.query_range("n", {"$gte": 0}), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import unittest
+
+from src import json_codec
+
+
+class BigIntegerTest(unittest.TestCase):
+    """orjson rejects integers wider than 64 bits; every encoder must fall back rather than fail."""
+
+    doc = {"n": 2 ** 70 + 1}
+
+    def test_dumps_bytes(self):
+        self.assertEqual(json.loads(json_codec.dumps_bytes(self.doc)), self.doc)
+
+    def test_dumps_pretty(self):
+        self.assertEqual(json.loads(json_codec.dumps_pretty(self.doc)), self.doc)
+
+    def test_dumps_pretty_bytes(self):
+        self.assertEqual(json.loads(json_codec.dumps_pretty_bytes(self.doc)), self.doc)
+
+    def test_iter_pretty(self):
+        self.assertEqual(json.loads("".join(json_codec.iter_pretty(self.doc))), self.doc)
+
+
+class NonAsciiTest(unittest.TestCase):
+    """Text output escapes non-ASCII like json.dumps, so it prints on any console encoding."""
+
+    doc = {"name": "caf\u00e9 \u6771\u4eac \U0001f600"}
+
+    def test_text_encoders_escape(self):
+        expected = json.dumps(self.doc, indent=2)
+        self.assertEqual(json_codec.dumps_pretty(self.doc), expected)
+        self.assertEqual("".join(json_codec.iter_pretty(self.doc)), expected)
+
+    def test_byte_encoder_keeps_utf8(self):
+        self.assertEqual(json.loads(json_codec.dumps_pretty_bytes(self.doc).decode("utf-8")), self.doc)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from src.query.query_parser import QueryParser
+
+
+class ParseCacheTest(unittest.TestCase):
+    def test_mutating_a_parsed_query_does_not_change_the_next_parse(self):
+        command = 'users.find{"age": {"$gt": 20}, "tags": ["a"]}'
+        first = QueryParser.parse(command)
+        first["query"]["age"]["$gt"] = 99
+        first["query"]["tags"].append("b")
+        first["query"]["extra"] = True
+
+        second = QueryParser.parse(command)
+        self.assertEqual(second["query"], {"age": {"$gt": 20}, "tags": ["a"]})
+        self.assertIsNot(second["query"], first["query"])
+
+    def test_delete_queries_are_copied_too(self):
+        command = 'users.delete{"name": "Alice"}'
+        QueryParser.parse(command)["query"].clear()
+        self.assertEqual(QueryParser.parse(command)["query"], {"name": "Alice"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from src.config import config
+import server
+
+_read_message = server.KiteDBRequestHandler._read_message
+
+
+def _frame(payload: bytes) -> bytes:
+    return server._FRAME_HEADER.pack(len(payload)) + payload
+
+
+class LoggedDataTest(unittest.TestCase):
+    def test_big_integers_are_logged(self):
+        self.assertIn(str(2 ** 70 + 1), server._format_logged_data([{"n": 2 ** 70 + 1}]))
+
+    def test_unencodable_data_does_not_raise(self):
+        self.assertIn("not logged", server._format_logged_data([{"n": {1, 2}}]))
+
+
+class ReadMessageTest(unittest.TestCase):
+    def test_newline_and_framed_messages_share_a_stream(self):
+        stream = io.BytesIO(b"help\n" + _frame(b"list") + b"use db\n")
+        self.assertEqual(_read_message(stream), (False, b"help\n"))
+        self.assertEqual(_read_message(stream), (True, b"list"))
+        self.assertEqual(_read_message(stream), (False, b"use db\n"))
+        self.assertEqual(_read_message(stream), (False, b""))
+
+    def test_framed_payload_may_contain_newlines(self):
+        payload = b'c.add{\n  "a": 1\n}'
+        self.assertEqual(_read_message(io.BytesIO(_frame(payload))), (True, payload))
+
+    def test_truncated_frame_is_dropped(self):
+        self.assertEqual(_read_message(io.BytesIO(_frame(b"0123456789")[:-3])), (True, b""))
+        self.assertEqual(_read_message(io.BytesIO(b"\x00\x00")), (True, b""))
+
+    def test_line_length_is_capped_like_a_frame(self):
+        at_cap = b"x" * (server._MAX_FRAME - 1) + b"\n"
+        self.assertEqual(_read_message(io.BytesIO(at_cap)), (False, at_cap))
+        self.assertEqual(_read_message(io.BytesIO(b"x" * (server._MAX_FRAME + 1))), (False, b""))
+
+
+class LiveServerTest(unittest.TestCase):
+    """A server on an ephemeral port, its users, ACL and data in a throwaway directory."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp()
+        cls.data_root = config.config["storage"]["data_root"]
+        config.config["storage"]["data_root"] = os.path.join(cls.tmp, "db")
+        os.chdir(cls.tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.server = server.KiteDBServer(("127.0.0.1", 0), server.KiteDBRequestHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        os.chdir(cls.cwd)
+        config.config["storage"]["data_root"] = cls.data_root
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def connect(self):
+        conn = socket.create_connection(self.server.server_address, timeout=10)
+        self.addCleanup(conn.close)
+        return conn, conn.makefile("rb")
+
+    @staticmethod
+    def send_line(conn, rfile, cmd):
+        conn.sendall(cmd.encode() + b"\n")
+        return json.loads(rfile.readline())
+
+    @staticmethod
+    def send_framed(conn, rfile, cmd):
+        conn.sendall(_frame(cmd.encode()))
+        length, = server._FRAME_HEADER.unpack(rfile.read(server._FRAME_HEADER.size))
+        return json.loads(rfile.read(length))
+
+    def test_replies_use_the_framing_of_the_request(self):
+        conn, rfile = self.connect()
+        self.assertEqual(self.send_framed(conn, rfile, "login admin admin")["status"], "success")
+        self.assertEqual(self.send_line(conn, rfile, "help")["status"], "success")
+        self.assertEqual(self.send_framed(conn, rfile, "help")["status"], "success")
+
+    def test_tabs_separate_login_words(self):
+        conn, rfile = self.connect()
+        self.assertEqual(self.send_line(conn, rfile, "login\tadmin\tadmin")["status"], "success")
+
+    def test_session_token_expires(self):
+        conn, rfile = self.connect()
+        token = self.send_line(conn, rfile, "login admin admin")["token"]
+
+        conn, rfile = self.connect()
+        self.assertEqual(self.send_line(conn, rfile, f"auth {token}")["status"], "success")
+
+        conn, rfile = self.connect()
+        later = time.monotonic() + self.server.sessions.ttl + 1
+        with mock.patch("src.auth.session_store.time.monotonic", return_value=later):
+            self.assertEqual(self.send_line(conn, rfile, f"auth {token}")["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
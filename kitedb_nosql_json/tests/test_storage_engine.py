@@ -0,0 +1,91 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad
+
+from src.config import config
+from src.core.database import Database
+from src.storage.storage_engine import StorageEngine, _GCM_MAGIC
+
+
+class StorageTestCase(unittest.TestCase):
+    """Points the data root at a throwaway directory for each test."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data_root = config.config["storage"]["data_root"]
+        config.config["storage"]["data_root"] = self.tmp
+
+    def tearDown(self):
+        config.config["storage"]["data_root"] = self.data_root
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    @staticmethod
+    def crash(db):
+        """Drop the journal handle without a snapshot, as a dying process would."""
+        if db.storage._journal is not None:
+            db.storage._journal.close()
+            db.storage._journal = None
+
+
+class JournalReplayTest(StorageTestCase):
+    def test_changes_since_the_last_snapshot_survive_a_crash(self):
+        db = Database("j")
+        db.create_collection("c")
+        coll = db.get_collection("c")
+        coll.insert([{"k": 1}, {"k": 2}, {"k": 3}])
+        db.flush()
+        # Journaled but never snapshotted, as if the process died before the next save
+        coll.insert({"k": 4})
+        coll.update({"k": 1}, {"v": "x"})
+        coll.delete({"k": 2})
+        self.assertGreater(db.storage.journal_records, 0)
+        self.crash(db)
+
+        reopened = Database("j")
+        self.assertEqual(reopened.get_collection("c").find({}), coll.find({}))
+        self.assertEqual(reopened.get_collection("c").find({"v": "x"}), [{"k": 1, "v": "x"}])
+
+    def test_torn_journal_tail_is_discarded(self):
+        db = Database("t")
+        db.create_collection("c")
+        db.get_collection("c").insert({"k": 1})
+        self.crash(db)
+        journal = db.storage.journal_path
+        size = os.path.getsize(journal)
+        # A record header promising more bytes than made it to disk
+        with open(journal, "ab") as f:
+            f.write(b"\x00\x00\x01\x00partial")
+
+        reopened = Database("t")
+        self.assertEqual(reopened.get_collection("c").find({}), [{"k": 1}])
+        self.assertEqual(os.path.getsize(journal), size)
+
+
+class LegacyEncryptionTest(StorageTestCase):
+    def test_chunks_written_with_aes_cbc_still_load(self):
+        engine = StorageEngine("legacy")
+        data = {"collections": {"c": [{"a": 1}]}, "schemas": {}}
+        iv = os.urandom(16)
+        cipher = AES.new(engine.key, AES.MODE_CBC, iv=iv)
+        with open(engine._chunk_path(0), "wb") as f:
+            f.write(iv + cipher.encrypt(pad(pickle.dumps(data), AES.block_size)))
+
+        reloaded = StorageEngine("legacy")
+        loaded = reloaded.load()
+        self.assertEqual(loaded["collections"], {"c": [{"a": 1}]})
+
+        # The next save of that chunk rewrites it in the GCM format
+        reloaded.mark_dirty("c")
+        reloaded.save(loaded)
+        with open(reloaded._chunk_path(0), "rb") as f:
+            self.assertTrue(f.read().startswith(_GCM_MAGIC))
+        self.assertEqual(StorageEngine("legacy").load()["collections"], {"c": [{"a": 1}]})
+
+
+if __name__ == "__main__":
+    unittest.main()